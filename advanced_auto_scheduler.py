@@ -1,19 +1,65 @@
 # advanced_auto_scheduler.py - نظام الجدولة المتطور للتدريب التلقائي
-import schedule
 import time
 import threading
 import json
 from datetime import datetime, timedelta
 import logging
+import logging.handlers
+import queue
 import os
+import sys
 from smart_auto_trainer import SmartAutoTrainer
 from social_media_collector import SocialMediaCollector
 import sqlite3
-from typing import Dict, List
-import psutil
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
+import heapq
+from operator import itemgetter
+from types import MappingProxyType
+from typing import Dict, List, Optional, Tuple
+
+# psutil يُستورد عند أول استخدام فقط لتسريع بدء التشغيل
+_psutil = None
+
+def _get_psutil():
+    global _psutil
+    if _psutil is None:
+        import psutil as _psutil
+    return _psutil
+
+# محاولة استخدام zstandard لضغط أسرع للنسخ الاحتياطية (والرجوع إلى gzip عند عدم توفره)
+try:
+    import zstandard as _zstd
+except Exception:
+    _zstd = None
+
+BACKUP_SUFFIXES = ('.tar.gz', '.tar.zst')
+
+# محاولة استخدام orjson لتسريع تحويل JSON (والرجوع إلى json القياسي عند عدم توفره)
+try:
+    import orjson as _fastjson
+    def _json_dumps(obj) -> str:
+        return _fastjson.dumps(obj).decode('utf-8')
+except Exception:
+    def _json_dumps(obj) -> str:
+        return json.dumps(obj, ensure_ascii=False)
+
+# فاصل الرسائل المطبوعة
+SEP = '=' * 60
+
+# عدد قراءات الموارد المؤجلة قبل كتابتها دفعة واحدة (12 قراءة = ساعة بمعدل كل 5 دقائق)
+HEALTH_FLUSH_BATCH = 12
+
+# مدة صلاحية آخر قراءة للموارد، ومعدل تحديث عدد العمليات الأبطأ (بالثواني)
+RESOURCES_CACHE_TTL = 10
+PROCESS_COUNT_TTL = 300
+
+# مكافأة الجودة حسب منصة المصدر (للقراءة فقط)
+PLATFORM_BONUS = MappingProxyType({
+    'twitter': 0.2,
+    'reddit': 0.25,
+    'forum': 0.3,
+    'youtube': 0.15,
+    'instagram': 0.15
+})
 
 class AdvancedAutoScheduler:
     """نظام الجدولة المتطور للتدريب التلقائي المستمر"""
@@ -21,6 +67,7 @@ class AdvancedAutoScheduler:
     def __init__(self, config_file: str = "scheduler_config.json"):
         self.config_file = config_file
         self.load_configuration()
+        self._refresh_config_cache()
         self.setup_logging()
         self.setup_database()
         
@@ -41,9 +88,15 @@ class AdvancedAutoScheduler:
             'average_session_duration': 0
         }
         
-        # خيط منفصل للمراقبة
-        self.monitor_thread = None
-        self.stop_monitoring = False
+        # حدث الإيقاف يوقظ حلقة الجدولة فوراً بدل انتظار الموعد التالي
+        self._stop_event = threading.Event()
+        
+        # ذاكرة مؤقتة لقراءات الموارد
+        self._last_resources = None
+        self._last_resources_time = 0.0
+        self._process_count = 0
+        self._process_count_time = None
+        self._cpu_primed = False
     
     def load_configuration(self):
         """تحميل إعدادات النظام"""
@@ -103,16 +156,34 @@ class AdvancedAutoScheduler:
             self.config = default_config
     
     def deep_update(self, base_dict: dict, update_dict: dict) -> dict:
-        """تحديث عميق للقاموس"""
-        for key, value in update_dict.items():
-            if key in base_dict and isinstance(base_dict[key], dict) and isinstance(value, dict):
-                base_dict[key] = self.deep_update(base_dict[key], value)
-            else:
-                base_dict[key] = value
-        return base_dict
+        """تحديث عميق للقاموس (بدون تعديل القاموس الأصلي)"""
+        result = {**base_dict}
+        stack = [(result, update_dict)]
+        
+        while stack:
+            base, update = stack.pop()
+            for key, value in update.items():
+                if isinstance(value, dict) and isinstance(base.get(key), dict):
+                    # نسخ القاموس الفرعي قبل تعديله حتى لا يتأثر الأصل
+                    base[key] = {**base[key]}
+                    stack.append((base[key], value))
+                else:
+                    base[key] = value
+        
+        return result
+    
+    def _refresh_config_cache(self):
+        """نسخ الإعدادات المستخدمة كثيراً إلى خصائص مباشرة"""
+        monitoring = self.config['system_monitoring']
+        self._max_cpu = monitoring['max_cpu_usage']
+        self._max_mem = monitoring['max_memory_usage']
+        self._min_disk = monitoring['disk_space_min_gb']
+        self._avoid_hours = self.config['training_schedule']['avoid_hours']
+        self._quality_threshold = self.config['data_collection']['quality_threshold']
     
     def save_configuration(self):
         """حفظ الإعدادات"""
+        self._refresh_config_cache()
         try:
             with open(self.config_file, 'w', encoding='utf-8') as f:
                 json.dump(self.config, f, ensure_ascii=False, indent=2)
@@ -122,24 +193,46 @@ class AdvancedAutoScheduler:
     
     def setup_logging(self):
         """إعداد نظام السجلات"""
+        self.logger = logging.getLogger('AdvancedScheduler')
+        self.log_listener = None
+        
+        # تجنب تكرار المعالجات (وتكرار كل سطر) عند إنشاء أكثر من مجدول في نفس العملية
+        if any(isinstance(h, logging.handlers.QueueHandler) for h in logging.getLogger().handlers):
+            return
+        
         log_format = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-        logging.basicConfig(
-            level=logging.INFO,
-            format=log_format,
-            handlers=[
-                logging.FileHandler(f'scheduler_{datetime.now().strftime("%Y%m%d")}.log', encoding='utf-8'),
-                logging.StreamHandler()
-            ]
+        formatter = logging.Formatter(log_format)
+        
+        # ملف سجل جديد كل منتصف ليل بدل اسم ثابت بتاريخ بدء التشغيل
+        file_handler = logging.handlers.TimedRotatingFileHandler(
+            'scheduler.log', when='midnight', encoding='utf-8'
         )
-        self.logger = logging.getLogger('AdvancedScheduler')
+        stream_handler = logging.StreamHandler()
+        file_handler.setFormatter(formatter)
+        stream_handler.setFormatter(formatter)
+        
+        # الكتابة الفعلية للملف والشاشة في خيط خلفي واحد، والخيوط الأخرى تضيف للطابور فقط
+        log_queue = queue.Queue(-1)
+        self.log_listener = logging.handlers.QueueListener(
+            log_queue, file_handler, stream_handler, respect_handler_level=True
+        )
+        self.log_listener.start()
+        
+        self._queue_handler = logging.handlers.QueueHandler(log_queue)
+        logging.basicConfig(level=logging.INFO, handlers=[self._queue_handler])
     
     def setup_database(self):
         """إعداد قاعدة بيانات الجدولة"""
         self.db_path = "scheduler_database.db"
-        self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        
+        # اتصال مستقل لكل خيط حتى لا تنتظر القراءة خلف كتابة خيط آخر
+        self._local = threading.local()
+        self._connections = []
+        self._connections_lock = threading.Lock()
+        conn = self._get_conn()
         
         # إنشاء الجداول
-        self.conn.execute('''
+        conn.execute('''
             CREATE TABLE IF NOT EXISTS scheduler_sessions (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 session_start DATETIME,
@@ -153,7 +246,7 @@ class AdvancedAutoScheduler:
             )
         ''')
         
-        self.conn.execute('''
+        conn.execute('''
             CREATE TABLE IF NOT EXISTS system_health (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
@@ -164,12 +257,65 @@ class AdvancedAutoScheduler:
             )
         ''')
         
-        self.conn.commit()
+        conn.commit()
+        
+        # نصوص الإدخال ثابتة حتى تعيد sqlite3 استخدام الجمل المحضّرة من ذاكرتها المؤقتة
+        self._stmt_insert_health = (
+            "INSERT INTO system_health "
+            "(cpu_usage, memory_usage, disk_usage, active_connections) "
+            "VALUES (?, ?, ?, ?)"
+        )
+        self._stmt_insert_session = (
+            "INSERT INTO scheduler_sessions "
+            "(session_start, session_end, status, sentences_collected, "
+            "sentences_trained, sources_used, error_message, system_resources) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
+        )
+        
+        # قراءات صحة النظام بانتظار الكتابة في معاملة واحدة
+        self._pending_health_rows = []
+    
+    def _get_conn(self) -> sqlite3.Connection:
+        """اتصال قاعدة البيانات الخاص بالخيط الحالي (يُنشأ عند أول استخدام)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            # check_same_thread=False فقط ليتمكن stop_system من إغلاق اتصالات الخيوط الأخرى
+            conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            
+            # WAL مع مزامنة عادية: fsync أقل لكل commit والقراءة لا تنتظر الكتابة
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute('PRAGMA temp_store=MEMORY')
+            conn.execute('PRAGMA mmap_size=134217728')
+            conn.execute('PRAGMA cache_size=-20000')
+            
+            self._local.conn = conn
+            with self._connections_lock:
+                self._connections.append(conn)
+        return conn
+    
+    def flush_health_rows(self):
+        """كتابة قراءات الموارد المؤجلة دفعة واحدة"""
+        if not self._pending_health_rows:
+            return
+        
+        rows, self._pending_health_rows = self._pending_health_rows, []
+        conn = self._get_conn()
+        with conn:
+            conn.executemany(self._stmt_insert_health, rows)
     
     def check_system_resources(self) -> Dict[str, float]:
         """فحص موارد النظام"""
+        now = time.monotonic()
+        if self._last_resources and now - self._last_resources_time < RESOURCES_CACHE_TTL:
+            return self._last_resources
+        
         try:
-            cpu_percent = psutil.cpu_percent(interval=1)
+            psutil = _get_psutil()
+            
+            # القراءة الأولى تحتاج فترة قصيرة، وما بعدها غير حاجب (الفرق منذ القراءة السابقة)
+            cpu_percent = psutil.cpu_percent(interval=None if self._cpu_primed else 0.1)
+            self._cpu_primed = True
             memory = psutil.virtual_memory()
             disk = psutil.disk_usage('.')
             
@@ -181,18 +327,23 @@ class AdvancedAutoScheduler:
                 'free_disk_gb': disk.free / (1024**3)
             }
             
-            # حفظ في قاعدة البيانات
-            self.conn.execute('''
-                INSERT INTO system_health 
-                (cpu_usage, memory_usage, disk_usage, active_connections)
-                VALUES (?, ?, ?, ?)
-            ''', (
+            # عدد العمليات مكلف (يمر على /proc) فيُحدّث بمعدل أبطأ
+            if self._process_count_time is None or now - self._process_count_time >= PROCESS_COUNT_TTL:
+                self._process_count = len(psutil.pids())
+                self._process_count_time = now
+            
+            # تأجيل الحفظ في قاعدة البيانات وكتابته على دفعات
+            self._pending_health_rows.append((
                 resources['cpu_usage'],
                 resources['memory_usage'], 
                 resources['disk_usage'],
-                len(psutil.pids())
+                self._process_count
             ))
-            self.conn.commit()
+            if len(self._pending_health_rows) >= HEALTH_FLUSH_BATCH:
+                self.flush_health_rows()
+            
+            self._last_resources = resources
+            self._last_resources_time = now
             
             return resources
             
@@ -205,15 +356,15 @@ class AdvancedAutoScheduler:
         current_hour = datetime.now().hour
         
         # تجنب الساعات المحددة
-        if current_hour in self.config['training_schedule']['avoid_hours']:
+        if current_hour in self._avoid_hours:
             return False
         
         # فحص موارد النظام
         resources = self.check_system_resources()
         if resources:
-            if (resources['cpu_usage'] > self.config['system_monitoring']['max_cpu_usage'] or
-                resources['memory_usage'] > self.config['system_monitoring']['max_memory_usage'] or
-                resources['free_disk_gb'] < self.config['system_monitoring']['disk_space_min_gb']):
+            if (resources['cpu_usage'] > self._max_cpu or
+                resources['memory_usage'] > self._max_mem or
+                resources['free_disk_gb'] < self._min_disk):
                 
                 self.logger.warning("تم تأجيل التدريب بسبب استهلاك موارد النظام")
                 return False
@@ -226,6 +377,12 @@ class AdvancedAutoScheduler:
             self.logger.info("تم تأجيل جلسة التدريب - الوقت غير مناسب")
             return
         
+        # الحد اليومي يشمل كل جلسات اليوم، فلا يُدرّب في هذه الجلسة إلا الباقي منه
+        remaining_today = self.config['training_schedule']['daily_limit'] - self.get_sentences_trained_today()
+        if remaining_today <= 0:
+            self.logger.info("تم تأجيل جلسة التدريب - بلغ حد الجمل اليومي")
+            return
+        
         session_start = datetime.now()
         self.current_session = {
             'start_time': session_start,
@@ -233,14 +390,18 @@ class AdvancedAutoScheduler:
             'sentences_collected': 0,
             'sentences_trained': 0,
             'sources_used': [],
-            'error_message': None
+            'error_message': None,
+            # قراءة الموارد عند البدء (مخزنة للتو بواسطة is_optimal_time_for_training)
+            'resources': self.check_system_resources()
         }
         
         self.logger.info(f"🚀 بدء جلسة تدريب ذكية - {session_start.strftime('%H:%M:%S')}")
-        print(f"\n{'='*60}")
-        print(f"🤖 جلسة التدريب الذكي التلقائي")
-        print(f"⏰ الوقت: {session_start.strftime('%Y-%m-%d %H:%M:%S')}")
-        print(f"{'='*60}")
+        print(
+            f"\n{SEP}\n"
+            f"🤖 جلسة التدريب الذكي التلقائي\n"
+            f"⏰ الوقت: {session_start.strftime('%Y-%m-%d %H:%M:%S')}\n"
+            f"{SEP}"
+        )
         
         try:
             # مرحلة 1: جمع البيانات من مصادر متعددة
@@ -250,31 +411,34 @@ class AdvancedAutoScheduler:
             )
             
             self.current_session['sentences_collected'] = len(collected_data)
-            self.current_session['sources_used'] = list(set(item['platform'] for item in collected_data))
             
             if not collected_data:
                 raise Exception("لم يتم جمع أي بيانات")
             
-            # مرحلة 2: تصفية وتحسين البيانات
+            # مرحلة 2: تصفية وتحسين البيانات (المصادر تُجمع في نفس المرور، وتُؤخذ أعلى العناصر حتى باقي الحد اليومي)
             print(f"🔍 مرحلة 2: تصفية البيانات... ({len(collected_data)} عنصر)")
-            high_quality_data = self.filter_high_quality_data(collected_data)
+            high_quality_data, self.current_session['sources_used'] = self._filter_with_sources(
+                collected_data, max_items=remaining_today
+            )
             
             print(f"✨ تم اختيار {len(high_quality_data)} عنصر عالي الجودة")
             
             # مرحلة 3: دمج البيانات مع النظام الذكي
             print("🧠 مرحلة 3: تحديث نظام نانو...")
             sentences = [item['content'] for item in high_quality_data]
+            emotions_list = self.smart_trainer.analyze_emotion_context_batch(sentences)
+            stored_at = datetime.now()
             
             # حفظ البيانات في النظام الذكي
             self.smart_trainer.store_collected_data([
                 {
                     'source': item['platform'],
                     'content': item['content'],
-                    'quality_score': self.calculate_quality_score(item),
-                    'emotions': self.smart_trainer.analyze_emotion_context(item['content']),
-                    'timestamp': datetime.now()
+                    'quality_score': self._get_or_compute_quality(item),
+                    'emotions': emotions,
+                    'timestamp': stored_at
                 }
-                for item in high_quality_data
+                for item, emotions in zip(high_quality_data, emotions_list)
             ])
             
             # إضافة الجمل إلى قاعدة البيانات
@@ -301,13 +465,15 @@ class AdvancedAutoScheduler:
             # حفظ معلومات الجلسة
             self.save_session_info()
             
-            print(f"\n{'='*60}")
-            print(f"✅ اكتملت الجلسة بنجاح!")
-            print(f"⏱️ المدة: {duration:.1f} ثانية")
-            print(f"📥 البيانات المجمعة: {len(collected_data)}")
-            print(f"🎯 الجمل المدربة: {added_count}")
-            print(f"📊 المصادر: {', '.join(self.current_session['sources_used'])}")
-            print(f"{'='*60}")
+            print(
+                f"\n{SEP}\n"
+                f"✅ اكتملت الجلسة بنجاح!\n"
+                f"⏱️ المدة: {duration:.1f} ثانية\n"
+                f"📥 البيانات المجمعة: {len(collected_data)}\n"
+                f"🎯 الجمل المدربة: {added_count}\n"
+                f"📊 المصادر: {', '.join(self.current_session['sources_used'])}\n"
+                f"{SEP}"
+            )
             
             self.logger.info(f"جلسة ناجحة: {added_count} جملة جديدة في {duration:.1f} ثانية")
             
@@ -333,20 +499,53 @@ class AdvancedAutoScheduler:
             # تحديث الإحصائيات العامة
             self.stats['total_sessions'] += 1
             self.current_session = None
+            
+            # الطرفية تفرغ كل سطر تلقائياً؛ عند التوجيه لملف أو أنبوب نفرغ مرة واحدة في النهاية
+            if not sys.stdout.isatty():
+                sys.stdout.flush()
     
-    def filter_high_quality_data(self, data: List[Dict]) -> List[Dict]:
+    def get_sentences_trained_today(self) -> int:
+        """عدد الجمل المدربة منذ بداية اليوم (من سجل الجلسات في قاعدة البيانات)"""
+        today_start = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        try:
+            row = self._get_conn().execute(
+                "SELECT COALESCE(SUM(sentences_trained), 0) FROM scheduler_sessions WHERE session_start >= ?",
+                (today_start,)
+            ).fetchone()
+            return row[0]
+        except Exception as e:
+            self.logger.error(f"خطأ في حساب جمل اليوم: {str(e)}")
+            return 0
+    
+    def filter_high_quality_data(self, data: List[Dict], max_items: Optional[int] = None) -> List[Dict]:
         """تصفية البيانات عالية الجودة"""
-        threshold = self.config['data_collection']['quality_threshold']
+        return self._filter_with_sources(data, max_items)[0]
+    
+    def _filter_with_sources(self, data: List[Dict], max_items: Optional[int] = None) -> Tuple[List[Dict], List[str]]:
+        """تصفية البيانات مع جمع المصادر المستخدمة (بترتيب ظهورها) في نفس المرور"""
+        threshold = self._quality_threshold
         
+        sources = {}
         high_quality = []
         for item in data:
+            sources[item['platform']] = None
             quality_score = self.calculate_quality_score(item)
             if quality_score >= threshold:
                 item['calculated_quality'] = quality_score
                 high_quality.append(item)
         
-        # ترتيب حسب الجودة
-        return sorted(high_quality, key=lambda x: x['calculated_quality'], reverse=True)
+        # ترتيب حسب الجودة (اختيار أعلى العناصر فقط عند تحديد حد أقصى)
+        by_quality = itemgetter('calculated_quality')
+        if max_items is not None and max_items < len(high_quality):
+            return heapq.nlargest(max_items, high_quality, key=by_quality), list(sources)
+        return sorted(high_quality, key=by_quality, reverse=True), list(sources)
+    
+    def _get_or_compute_quality(self, item: Dict) -> float:
+        """إرجاع درجة الجودة المحسوبة مسبقاً أو حسابها"""
+        quality_score = item.get('calculated_quality')
+        if quality_score is None:
+            quality_score = self.calculate_quality_score(item)
+        return quality_score
     
     def calculate_quality_score(self, item: Dict) -> float:
         """حساب درجة جودة العنصر"""
@@ -363,16 +562,8 @@ class AdvancedAutoScheduler:
                 base_quality = 0.2  # جودة ضعيفة
         
         # تعديلات إضافية حسب المصدر والتفاعل
-        platform_bonus = {
-            'twitter': 0.2,
-            'reddit': 0.25,
-            'forum': 0.3,
-            'youtube': 0.15,
-            'instagram': 0.15
-        }
-        
         engagement_bonus = min(item.get('engagement', 0) / 50, 0.2)  # مكافأة أفضل للتفاعل
-        platform_score = platform_bonus.get(item.get('platform', ''), 0.1)
+        platform_score = PLATFORM_BONUS.get(item.get('platform', ''), 0.1)
         
         final_score = min(base_quality + platform_score + engagement_bonus, 1.0)
         
@@ -385,25 +576,24 @@ class AdvancedAutoScheduler:
         
         try:
             session_end = datetime.now()
-            resources = self.check_system_resources()
-            
-            self.conn.execute('''
-                INSERT INTO scheduler_sessions 
-                (session_start, session_end, status, sentences_collected, 
-                 sentences_trained, sources_used, error_message, system_resources)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                self.current_session['start_time'],
-                session_end,
-                self.current_session['status'],
-                self.current_session['sentences_collected'],
-                self.current_session['sentences_trained'],
-                json.dumps(self.current_session['sources_used'], ensure_ascii=False),
-                self.current_session['error_message'],
-                json.dumps(resources, ensure_ascii=False)
-            ))
             
-            self.conn.commit()
+            # كتابة الجلسة وقراءات الموارد المؤجلة في معاملة واحدة
+            health_rows, self._pending_health_rows = self._pending_health_rows, []
+            conn = self._get_conn()
+            with conn:
+                if health_rows:
+                    conn.executemany(self._stmt_insert_health, health_rows)
+                
+                conn.execute(self._stmt_insert_session, (
+                    self.current_session['start_time'],
+                    session_end,
+                    self.current_session['status'],
+                    self.current_session['sentences_collected'],
+                    self.current_session['sentences_trained'],
+                    _json_dumps(self.current_session['sources_used']),
+                    self.current_session['error_message'],
+                    _json_dumps(self.current_session['resources'])
+                ))
             
         except Exception as e:
             self.logger.error(f"خطأ في حفظ معلومات الجلسة: {str(e)}")
@@ -428,17 +618,19 @@ class AdvancedAutoScheduler:
                 os.makedirs(backup_dir)
             
             timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            backup_file = os.path.join(backup_dir, f"nano_backup_{timestamp}.tar.gz")
             
-            # نسخ الملفات المهمة
+            # نسخ الملفات المهمة مع ضغط متدفق سريع
             import tarfile
-            with tarfile.open(backup_file, 'w:gz') as tar:
-                if os.path.exists('corpus.json'):
-                    tar.add('corpus.json')
-                if os.path.exists(self.db_path):
-                    tar.add(self.db_path)
-                if os.path.exists('smart_training_cache.db'):
-                    tar.add('smart_training_cache.db')
+            if _zstd is not None:
+                backup_file = os.path.join(backup_dir, f"nano_backup_{timestamp}.tar.zst")
+                compressor = _zstd.ZstdCompressor(level=3, threads=-1)
+                with open(backup_file, 'wb') as raw, compressor.stream_writer(raw) as stream:
+                    with tarfile.open(fileobj=stream, mode='w|') as tar:
+                        self._add_backup_files(tar)
+            else:
+                backup_file = os.path.join(backup_dir, f"nano_backup_{timestamp}.tar.gz")
+                with tarfile.open(backup_file, 'w:gz', compresslevel=1) as tar:
+                    self._add_backup_files(tar)
             
             print(f"💾 تم إنشاء نسخة احتياطية: {backup_file}")
             self.logger.info(f"نسخة احتياطية: {backup_file}")
@@ -449,6 +641,18 @@ class AdvancedAutoScheduler:
         except Exception as e:
             self.logger.error(f"فشل إنشاء النسخة الاحتياطية: {str(e)}")
     
+    def _add_backup_files(self, tar):
+        """إضافة الملفات المهمة إلى أرشيف النسخة الاحتياطية"""
+        if os.path.exists('corpus.json'):
+            tar.add('corpus.json')
+        if os.path.exists(self.db_path):
+            # دمج ملف WAL في قاعدة البيانات قبل نسخها
+            self.flush_health_rows()
+            self._get_conn().execute('PRAGMA wal_checkpoint(TRUNCATE)')
+            tar.add(self.db_path)
+        if os.path.exists('smart_training_cache.db'):
+            tar.add('smart_training_cache.db')
+    
     def cleanup_old_backups(self):
         """حذف النسخ الاحتياطية القديمة"""
         try:
@@ -458,50 +662,42 @@ class AdvancedAutoScheduler:
             if not os.path.exists(backup_dir):
                 return
             
-            cutoff_date = datetime.now() - timedelta(days=keep_days)
+            cutoff_ts = (datetime.now() - timedelta(days=keep_days)).timestamp()
             
-            for filename in os.listdir(backup_dir):
-                if filename.startswith('nano_backup_') and filename.endswith('.tar.gz'):
-                    filepath = os.path.join(backup_dir, filename)
-                    file_time = datetime.fromtimestamp(os.path.getctime(filepath))
-                    
-                    if file_time < cutoff_date:
-                        os.remove(filepath)
-                        self.logger.info(f"حذف نسخة احتياطية قديمة: {filename}")
+            # scandir يعيد نتيجة stat مع كل مدخل بدل استدعاء منفصل لكل ملف
+            with os.scandir(backup_dir) as entries:
+                for entry in entries:
+                    if (entry.name.startswith('nano_backup_') and entry.name.endswith(BACKUP_SUFFIXES)
+                            and entry.stat().st_mtime < cutoff_ts):
+                        os.remove(entry.path)
+                        self.logger.info(f"حذف نسخة احتياطية قديمة: {entry.name}")
         
         except Exception as e:
             self.logger.error(f"خطأ في تنظيف النسخ الاحتياطية: {str(e)}")
     
-    def start_monitoring(self):
-        """بدء مراقبة النظام"""
-        def monitor_loop():
-            while not self.stop_monitoring:
-                try:
-                    resources = self.check_system_resources()
-                    
-                    # فحص حالة النظام
-                    if resources:
-                        if resources['cpu_usage'] > 90:
-                            self.send_notification(f"استهلاك CPU عالي: {resources['cpu_usage']:.1f}%")
-                        
-                        if resources['memory_usage'] > 90:
-                            self.send_notification(f"استهلاك ذاكرة عالي: {resources['memory_usage']:.1f}%")
-                        
-                        if resources['free_disk_gb'] < 1:
-                            self.send_notification(f"مساحة القرص منخفضة: {resources['free_disk_gb']:.1f} GB")
-                    
-                    time.sleep(300)  # فحص كل 5 دقائق
-                    
-                except Exception as e:
-                    self.logger.error(f"خطأ في مراقبة النظام: {str(e)}")
-                    time.sleep(60)
-        
-        self.monitor_thread = threading.Thread(target=monitor_loop, daemon=True)
-        self.monitor_thread.start()
-        self.logger.info("تم بدء مراقبة النظام")
+    def _health_check_tick(self):
+        """فحص دوري لموارد النظام (يعمل ضمن حلقة الجدولة)"""
+        try:
+            resources = self.check_system_resources()
+            
+            # فحص حالة النظام
+            if resources:
+                if resources['cpu_usage'] > 90:
+                    self.send_notification(f"استهلاك CPU عالي: {resources['cpu_usage']:.1f}%")
+                
+                if resources['memory_usage'] > 90:
+                    self.send_notification(f"استهلاك ذاكرة عالي: {resources['memory_usage']:.1f}%")
+                
+                if resources['free_disk_gb'] < 1:
+                    self.send_notification(f"مساحة القرص منخفضة: {resources['free_disk_gb']:.1f} GB")
+        
+        except Exception as e:
+            self.logger.error(f"خطأ في مراقبة النظام: {str(e)}")
     
     def start_scheduler(self):
         """بدء جدولة التدريب المتقدمة"""
+        import schedule
+        
         self.is_running = True
         interval_hours = self.config['training_schedule']['interval_hours']
         
@@ -518,17 +714,23 @@ class AdvancedAutoScheduler:
         if self.config['backup']['enable_backup']:
             schedule.every(self.config['backup']['backup_interval_hours']).hours.do(self.create_backup)
         
-        # بدء المراقبة
-        self.start_monitoring()
+        # مراقبة الموارد كل 5 دقائق على نفس حلقة الجدولة
+        schedule.every(5).minutes.do(self._health_check_tick)
+        self.logger.info("تم بدء مراقبة النظام")
         
         # تشغيل جلسة فورية
         print("▶️ تشغيل جلسة تدريب فورية...")
         self.run_intelligent_training_session()
         
         try:
+            # النوم حتى موعد المهمة التالية بدل الفحص الدوري
             while self.is_running:
+                idle = schedule.idle_seconds()
+                if idle is None:
+                    break
+                if idle > 0 and self._stop_event.wait(timeout=idle):
+                    break
                 schedule.run_pending()
-                time.sleep(30)  # فحص كل 30 ثانية
                 
         except KeyboardInterrupt:
             print("\n🛑 إيقاف النظام...")
@@ -542,10 +744,7 @@ class AdvancedAutoScheduler:
     def stop_system(self):
         """إيقاف النظام"""
         self.is_running = False
-        self.stop_monitoring = True
-        
-        if self.monitor_thread and self.monitor_thread.is_alive():
-            self.monitor_thread.join(timeout=5)
+        self._stop_event.set()
         
         # إغلاق الاتصالات
         if hasattr(self.social_collector, 'close'):
@@ -554,10 +753,25 @@ class AdvancedAutoScheduler:
         if hasattr(self.smart_trainer, 'conn'):
             self.smart_trainer.conn.close()
         
-        self.conn.close()
+        try:
+            self.flush_health_rows()
+        except Exception as e:
+            self.logger.error(f"خطأ في حفظ قراءات الموارد: {str(e)}")
+        
+        with self._connections_lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+        self._local = threading.local()
         
         print("✅ تم إيقاف النظام بأمان")
         self.logger.info("تم إيقاف النظام بواسطة المستخدم")
+        
+        # تفريغ طابور السجلات قبل الخروج (قد يُستدعى الإيقاف مرتين)
+        if self.log_listener is not None:
+            logging.getLogger().removeHandler(self._queue_handler)
+            self.log_listener.stop()
+            self.log_listener = None
     
     def get_detailed_statistics(self):
         """إحصائيات مفصلة للنظام"""
@@ -574,7 +788,7 @@ class AdvancedAutoScheduler:
         
         # إحصائيات من قاعدة البيانات
         try:
-            cursor = self.conn.execute('''
+            cursor = self._get_conn().execute('''
                 SELECT COUNT(*), AVG(sentences_trained), SUM(sentences_collected)
                 FROM scheduler_sessions WHERE status = 'completed'
             ''')
@@ -592,7 +806,7 @@ if __name__ == "__main__":
     scheduler = AdvancedAutoScheduler()
     
     print("🤖 نظام الجدولة المتطور للتدريب التلقائي")
-    print("="*60)
+    print(SEP)
     print("1. بدء التدريب التلقائي المستمر")
     print("2. تشغيل جلسة تدريب واحدة")
     print("3. عرض الإحصائيات المفصلة")
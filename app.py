@@ -40,9 +40,14 @@ def run_scheduler():
     # جدولة دورة التعلم لتعمل كل 5 ساعات
     schedule.every(5).hours.do(learning_cycle_job)
     
+    # النوم حتى موعد المهمة التالية بدل الفحص كل دقيقة
     while True:
+        idle = schedule.idle_seconds()
+        if idle is None:
+            break
+        if idle > 0:
+            time.sleep(idle)
         schedule.run_pending()
-        time.sleep(60) # التحقق كل دقيقة
 
 # --- نهاية الجزء الجديد ---
 
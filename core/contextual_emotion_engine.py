@@ -3,12 +3,114 @@ import json
 import re
 import math
 from typing import Dict, List, Tuple, Optional, Set
-from collections import defaultdict, deque
+from collections import defaultdict, deque, Counter
+from collections.abc import Mapping
+from operator import mul
+from functools import lru_cache
+from itertools import islice, repeat
 from dataclasses import dataclass, asdict
 from datetime import datetime, timedelta
 import pickle
+import gzip
+import heapq
 import os
 
+# محاولة استخدام pyahocorasick لمسح كل الأنماط في مرور واحد (والرجوع إلى جدول أنماط مسطح عند عدم توفره)
+try:
+    import ahocorasick as _ahocorasick
+except Exception:
+    _ahocorasick = None
+
+@lru_cache(maxsize=256)
+def _token_set(text: str) -> frozenset:
+    """كلمات النص بأحرف صغيرة (مع ذاكرة مؤقتة للنصوص المتكررة في سياق المحادثة)"""
+    return frozenset(text.lower().split())
+
+# علامات التعجب والاستفهام (العربية والإنجليزية) تُلتقط في مرور واحد
+_PUNCTUATION_RE = re.compile(r"[!?؟]")
+_TONE_PUNCTUATION_RE = re.compile(r"[!؟]")
+
+# جدول تحويل بايتات ASCII: 1 للأحرف الكبيرة و0 لغيرها (لعدّ الأحرف الكبيرة داخل C)
+_ASCII_CAPS_TABLE = bytes(1 if 0x41 <= i <= 0x5A else 0 for i in range(256))
+
+def _score_rows(rows: List[Optional[List[float]]], x: List[float]) -> List[Optional[float]]:
+    """الجزء العددي من التوقع: ضرب كل صف أوزان في متجه الخصائص وقص الناتج إلى [0, 1]"""
+    scores = []
+    for row in rows:
+        if row is None:
+            scores.append(None)
+        else:
+            p = sum(map(mul, row, x))
+            scores.append(0.0 if p < 0.0 else (1.0 if p > 1.0 else p))
+    return scores
+
+@dataclass(slots=True)
+class HistoryEntry:
+    """سجل تفاعل واحد في تاريخ التعلم"""
+    user_input: str
+    predicted_emotion: str
+    response_type: str
+    feedback_score: float
+    timestamp: datetime
+    features: Dict[str, float]
+    tokens: frozenset
+
+    def to_dict(self) -> Dict:
+        """تحويل السجل لقاموس قابل للحفظ (بدون مجموعة الكلمات المشتقة)"""
+        return {
+            'user_input': self.user_input,
+            'predicted_emotion': self.predicted_emotion,
+            'response_type': self.response_type,
+            'feedback_score': self.feedback_score,
+            'timestamp': self.timestamp.isoformat(),
+            'features': self.features
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "HistoryEntry":
+        """بناء السجل من قاموس محفوظ"""
+        timestamp = data.get('timestamp')
+        if isinstance(timestamp, str):
+            timestamp = datetime.fromisoformat(timestamp)
+        user_input = data.get('user_input', '')
+        return cls(
+            user_input=user_input,
+            predicted_emotion=data.get('predicted_emotion', 'غير محدد'),
+            response_type=data.get('response_type', ''),
+            feedback_score=data.get('feedback_score', 0.5),
+            timestamp=timestamp or datetime.now(),
+            features=data.get('features', {}),
+            tokens=_token_set(user_input)
+        )
+
+class AnalysisDetails(Mapping):
+    """تفاصيل التحليل - الاحتماليات وعوامل السياق تُحسب عند أول طلب فقط"""
+    _KEYS = ("features", "emotion_probabilities", "context_factors")
+    
+    def __init__(self, engine: "ContextualEmotionEngine", features: Dict[str, float], probabilities: List[float]):
+        self._engine = engine
+        self._features = features
+        self._probabilities = probabilities
+        self._computed = {}
+
+    def __getitem__(self, key):
+        if key == "features":
+            return self._features
+        if key not in self._computed:
+            if key == "emotion_probabilities":
+                self._computed[key] = dict(zip(self._engine.emotion_types, self._probabilities))
+            elif key == "context_factors":
+                self._computed[key] = self._engine.analyze_context_factors(self._features)
+            else:
+                raise KeyError(key)
+        return self._computed[key]
+
+    def __iter__(self):
+        return iter(self._KEYS)
+
+    def __len__(self):
+        return len(self._KEYS)
+
 @dataclass
 class EmotionContext:
     """سياق المشاعر"""
@@ -31,7 +133,7 @@ class ConversationPattern:
 class ContextualEmotionEngine:
     """محرك المشاعر السياقي - يتعلم من التفاعلات"""
     
-    def __init__(self, learning_data_path: str = "data/emotion_learning.pkl"):
+    def __init__(self, learning_data_path: str = "data/emotion_learning.json.gz"):
         self.learning_data_path = learning_data_path
         
         # الأنواع الأساسية للمشاعر
@@ -42,14 +144,19 @@ class ContextualEmotionEngine:
         
         # تاريخ المحادثات للتعلم
         self.conversation_history = deque(maxlen=100)
+        self.rebuild_history_aggregates()
         self.emotion_patterns = {}
         self.contextual_features = {}
         
-        # نماذج التعلم
-        self.situation_emotion_map = defaultdict(lambda: defaultdict(float))
+        # نماذج التعلم: مصفوفة أوزان كثيفة (صف لكل مشاعر، عمود لكل خاصية)
+        self.emotion_index = {emotion: i for i, emotion in enumerate(self.emotion_types)}
+        self.reset_emotion_weights()
         self.context_weights = defaultdict(float)
         self.learned_patterns = []
         
+        # آخر خصائص محسوبة في التوقع (يعاد استخدامها عند التعلم من نفس الرسالة)
+        self._last_features = None
+        
         # إحصائيات التعلم
         self.learning_stats = {
             "total_conversations": 0,
@@ -109,102 +216,164 @@ class ContextualEmotionEngine:
                 "response_type": "consolation"
             }
         }
-
-    def extract_context_features(self, text: str, conversation_context: List[str] = None) -> Dict[str, float]:
-        """استخراج خصائص السياق من النص"""
-        features = {}
-        text_lower = text.lower().strip()
-        
-        # 1. تحليل الكلمات والعبارات
-        words = text_lower.split()
-        features["word_count"] = len(words)
-        features["avg_word_length"] = sum(len(w) for w in words) / len(words) if words else 0
         
-        # 2. تحليل علامات الترقيم والتأكيد
-        features["exclamation_marks"] = text.count("!")
-        features["question_marks"] = text.count("?") + text.count("؟")
-        features["caps_ratio"] = sum(1 for c in text if c.isupper()) / len(text) if text else 0
+        # محلل المشاعر الضمنية
+        self.implicit_patterns = {
+            "dismissive": ["طيب", "ماشي", "كما تشاء", "عادي"],
+            "enthusiasm": ["والله", "ما شاء الله", "يلا", "هيا"],
+            "hesitation": ["ما أدري", "ممكن", "يمكن", "مو متأكد"]
+        }
         
-        # 3. تحليل التكرار
-        if conversation_context:
-            features["repetition_score"] = self.calculate_repetition_score(text, conversation_context)
-        else:
-            features["repetition_score"] = 0.0
+        # مفاتيح ثابتة لتحليل العوامل (بترتيب الأولوية للنبرة)
+        self._tone_keys = (
+            ("tone_aggressive", "عدواني"),
+            ("tone_sarcastic", "ساخر"),
+            ("tone_affectionate", "حنون")
+        )
+        self._social_keys = tuple((f"social_{context}", context) for context in self.social_contexts)
         
-        # 4. تحليل النبرة
-        tone_scores = self.analyze_tone_patterns(text_lower)
-        features.update(tone_scores)
+        # أنواع الردود حسب (المشاعر، السياق) مفهرسة بالمشاعر مباشرة
+        response_mapping = {
+            ("سعادة", "congratulations"): "celebration",
+            ("حزن", "complaint"): "empathy", 
+            ("غضب", "عدواني"): "calming",
+            ("ازدراء", "ساخر"): "playful_deflection",
+            ("حماس", "عالي"): "matching_energy",
+            ("خيبة أمل", "disappointment"): "encouragement"
+        }
+        self._response_by_emotion = {}
+        for (emotion, context), response_type in response_mapping.items():
+            self._response_by_emotion.setdefault(emotion, []).append((context, response_type))
         
-        # 5. تحليل السياق الاجتماعي
-        social_scores = self.analyze_social_context(text_lower)
-        features.update(social_scores)
+        # الردود الافتراضية للمشاعر الأساسية
+        self._emotion_default_responses = {
+            "سعادة": "positive_reinforcement",
+            "حزن": "empathy",
+            "غضب": "calming",
+            "حب": "affectionate",
+            "ازدراء": "respectful_distance",
+            "حماس": "matching_energy"
+        }
         
-        # 6. تحليل العاطفة الضمنية
-        implicit_scores = self.analyze_implicit_emotion(text_lower)
-        features.update(implicit_scores)
+        # مؤشرات مضافة أثناء التشغيل، والمؤشرات بانتظار إعادة بناء الماسح
+        self.custom_indicators = []
+        self._pending_indicators = []
         
-        return features
+        self.build_pattern_scanner()
+
+    def add_pattern(self, feature: str, pattern: str, weight: float = 0.3):
+        """إضافة مؤشر جديد لخاصية (مثل tone_sarcastic)؛ يُعاد بناء الماسح مرة واحدة قبل التوقع التالي"""
+        self._pending_indicators.append((pattern.lower(), feature, weight))
 
-    def analyze_tone_patterns(self, text: str) -> Dict[str, float]:
-        """تحليل أنماط النبرة"""
-        tone_scores = {}
+    def build_pattern_scanner(self):
+        """بناء ماسح واحد لكل مؤشرات النبرة والسياق الاجتماعي والمشاعر الضمنية"""
+        scan_keys = []
+        pattern_entries = {}  # النمط -> [(الخاصية، الوزن)]
         
         for tone, pattern in self.tone_patterns.items():
-            score = 0.0
-            
-            # فحص المؤشرات المباشرة
+            scan_keys.append(f"tone_{tone}")
             for indicator in pattern["indicators"]:
-                if indicator in text:
-                    score += 0.3
-            
-            # وزن علامات الترقيم
-            if "punctuation_weight" in pattern:
-                punct_count = text.count("!") + text.count("؟")
-                score += punct_count * pattern["punctuation_weight"]
-            
-            # تطبيع النتيجة
-            tone_scores[f"tone_{tone}"] = min(1.0, score)
-        
-        return tone_scores
-
-    def analyze_social_context(self, text: str) -> Dict[str, float]:
-        """تحليل السياق الاجتماعي"""
-        social_scores = {}
+                pattern_entries.setdefault(indicator, []).append((f"tone_{tone}", 0.3))
         
         for context, data in self.social_contexts.items():
-            score = 0.0
-            
+            scan_keys.append(f"social_{context}")
             for trigger in data["triggers"]:
-                if trigger in text:
-                    score += 0.4
-            
-            social_scores[f"social_{context}"] = min(1.0, score)
+                pattern_entries.setdefault(trigger, []).append((f"social_{context}", 0.4))
+        
+        for kind, patterns in self.implicit_patterns.items():
+            scan_keys.append(f"implicit_{kind}")
+            for p in patterns:
+                pattern_entries.setdefault(p, []).append((f"implicit_{kind}", 0.3))
+        
+        for p, feature, weight in self.custom_indicators:
+            if feature not in scan_keys:
+                scan_keys.append(feature)
+            pattern_entries.setdefault(p, []).append((feature, weight))
+        
+        # الأنماط تشير إلى مواقع الخصائص في مصفوفة النتائج بدل أسمائها
+        self._scan_keys = tuple(scan_keys)
+        key_index = {key: i for i, key in enumerate(scan_keys)}
+        self._pattern_table = tuple(
+            (p, tuple((key_index[key], weight) for key, weight in entries))
+            for p, entries in pattern_entries.items()
+        )
+        self._punctuation_weights = tuple(
+            (key_index[f"tone_{tone}"], pattern["punctuation_weight"])
+            for tone, pattern in self.tone_patterns.items()
+            if "punctuation_weight" in pattern
+        )
         
-        return social_scores
+        if _ahocorasick is not None:
+            self.ac = _ahocorasick.Automaton()
+            for i, (p, entries) in enumerate(self._pattern_table):
+                self.ac.add_word(p, (i, entries))
+            self.ac.make_automaton()
+        else:
+            self.ac = None
 
-    def analyze_implicit_emotion(self, text: str) -> Dict[str, float]:
-        """تحليل المشاعر الضمنية"""
-        implicit_scores = {}
+    def extract_context_features(self, text: str, conversation_context: List = None) -> Dict[str, float]:
+        """استخراج خصائص السياق من النص (السياق نصوص أو مجموعات كلمات جاهزة)"""
+        features = {}
+        text_lower = text.lower().strip()
+        
+        # 1. تحليل الكلمات والعبارات
+        words = text_lower.split()
+        features["word_count"] = len(words)
+        features["avg_word_length"] = sum(len(w) for w in words) / len(words) if words else 0
         
-        # تحليل أنماط الرفض الضمني
-        dismissive_patterns = ["طيب", "ماشي", "كما تشاء", "عادي"]
-        dismissive_score = sum(1 for p in dismissive_patterns if p in text) * 0.3
-        implicit_scores["implicit_dismissive"] = min(1.0, dismissive_score)
+        # 2. تحليل علامات الترقيم والتأكيد (التقاط العلامات في مرور واحد)
+        marks = _PUNCTUATION_RE.findall(text)
+        exclamation_marks = marks.count("!")
+        arabic_question_marks = marks.count("؟")
+        features["exclamation_marks"] = exclamation_marks
+        features["question_marks"] = len(marks) - exclamation_marks
+        caps = text.encode('ascii', 'ignore').translate(_ASCII_CAPS_TABLE).count(1)
+        features["caps_ratio"] = caps / len(text) if text else 0
         
-        # تحليل أنماط الحماس الضمني
-        enthusiasm_patterns = ["والله", "ما شاء الله", "يلا", "هيا"]
-        enthusiasm_score = sum(1 for p in enthusiasm_patterns if p in text) * 0.3
-        implicit_scores["implicit_enthusiasm"] = min(1.0, enthusiasm_score)
+        # 3. تحليل التكرار
+        if conversation_context:
+            context_tokens = [c if isinstance(c, frozenset) else _token_set(c)
+                              for c in conversation_context[-3:]]
+            features["repetition_score"] = self.calculate_repetition_score(frozenset(words), context_tokens)
+        else:
+            features["repetition_score"] = 0.0
         
-        # تحليل أنماط التردد
-        hesitation_patterns = ["ما أدري", "ممكن", "يمكن", "مو متأكد"]
-        hesitation_score = sum(1 for p in hesitation_patterns if p in text) * 0.3
-        implicit_scores["implicit_hesitation"] = min(1.0, hesitation_score)
+        # 4. تحليل النبرة والسياق الاجتماعي والعاطفة الضمنية
+        features.update(self.scan_patterns(text_lower, exclamation_marks + arabic_question_marks))
         
-        return implicit_scores
+        return features
+
+    def scan_patterns(self, text: str, punct_count: int = None) -> Dict[str, float]:
+        """تحليل النبرة والسياق الاجتماعي والمشاعر الضمنية في مرور واحد على النص"""
+        scores = [0.0] * len(self._scan_keys)
+        
+        # فحص المؤشرات المباشرة (كل نمط يُحسب مرة واحدة مهما تكرر)
+        if self.ac is not None:
+            matched = set()
+            for _, (i, entries) in self.ac.iter(text):
+                if i not in matched:
+                    matched.add(i)
+                    for idx, weight in entries:
+                        scores[idx] += weight
+        else:
+            for p, entries in self._pattern_table:
+                if p in text:
+                    for idx, weight in entries:
+                        scores[idx] += weight
+        
+        # وزن علامات الترقيم
+        if self._punctuation_weights:
+            if punct_count is None:
+                punct_count = len(_TONE_PUNCTUATION_RE.findall(text))
+            if punct_count:
+                for idx, weight in self._punctuation_weights:
+                    scores[idx] += punct_count * weight
+        
+        # تطبيع النتيجة في مرور واحد
+        return dict(zip(self._scan_keys, [score if score < 1.0 else 1.0 for score in scores]))
 
-    def calculate_repetition_score(self, text: str, context: List[str]) -> float:
-        """حساب درجة التكرار"""
+    def calculate_repetition_score(self, words1: frozenset, context: List[frozenset]) -> float:
+        """حساب درجة التكرار (من مجموعات كلمات محسوبة مسبقاً)"""
         if not context:
             return 0.0
         
@@ -212,62 +381,84 @@ class ContextualEmotionEngine:
         recent_context = context[-3:] if len(context) > 3 else context
         similarity_scores = []
         
-        for prev_text in recent_context:
-            # حساب التشابه البسيط
-            words1 = set(text.lower().split())
-            words2 = set(prev_text.lower().split())
-            
-            if len(words1.union(words2)) > 0:
-                similarity = len(words1.intersection(words2)) / len(words1.union(words2))
-                similarity_scores.append(similarity)
+        for words2 in recent_context:
+            # حساب التشابه البسيط (Jaccard) بدون بناء مجموعة الاتحاد
+            common = len(words1 & words2)
+            union_size = len(words1) + len(words2) - common
+            if union_size > 0:
+                similarity_scores.append(common / union_size)
         
         return max(similarity_scores) if similarity_scores else 0.0
 
-    def predict_emotion_contextual(self, text: str, conversation_context: List[str] = None) -> Tuple[str, float, Dict]:
+    def predict_emotion_contextual(self, text: str, conversation_context: List[str] = None) -> Tuple[str, float, Mapping]:
         """توقع المشاعر بناءً على السياق الكامل"""
         
+        # دمج المؤشرات الجديدة دفعة واحدة بدل إعادة بناء الماسح مع كل إضافة
+        if self._pending_indicators:
+            self.custom_indicators.extend(self._pending_indicators)
+            self._pending_indicators.clear()
+            self.build_pattern_scanner()
+        
         # استخراج خصائص السياق
         features = self.extract_context_features(text, conversation_context)
+        self._last_features = (text, features)
         
         # حساب احتماليات المشاعر
-        emotion_probabilities = {}
-        
-        for emotion in self.emotion_types:
-            prob = self.calculate_emotion_probability(emotion, features)
-            emotion_probabilities[emotion] = prob
+        probabilities = self.calculate_emotion_probabilities(features)
         
-        # اختيار أقوى مشاعر
-        predicted_emotion = max(emotion_probabilities.keys(), 
-                              key=lambda k: emotion_probabilities[k])
+        # اختيار أقوى مشاعر (فهرس أعلى احتمالية)
+        best = max(range(len(probabilities)), key=probabilities.__getitem__)
+        predicted_emotion = self.emotion_types[best]
+        confidence = probabilities[best]
         
-        confidence = emotion_probabilities[predicted_emotion]
-        
-        # إضافة تفاصيل التحليل
-        analysis_details = {
-            "features": features,
-            "emotion_probabilities": emotion_probabilities,
-            "context_factors": self.analyze_context_factors(features)
-        }
+        # إضافة تفاصيل التحليل (تُحسب عند الطلب فقط)
+        analysis_details = AnalysisDetails(self, features, probabilities)
         
         return predicted_emotion, confidence, analysis_details
 
-    def calculate_emotion_probability(self, emotion: str, features: Dict[str, float]) -> float:
-        """حساب احتمالية مشاعر معينة بناءً على الخصائص"""
-        
-        # الأوزان المتعلمة للخصائص المختلفة
-        if emotion not in self.situation_emotion_map:
-            # إذا لم نتعلم عن هذه المشاعر بعد، نستخدم القيم الافتراضية
-            return self.calculate_default_emotion_probability(emotion, features)
+    def reset_emotion_weights(self):
+        """تفريغ مصفوفة الأوزان المتعلمة"""
+        self.feature_index = {}
+        self.feature_names = []
+        # None = لم نتعلم عن هذه المشاعر بعد (تُستخدم القيم الافتراضية)
+        self.weight_matrix = [None] * len(self.emotion_index)
+
+    def add_feature(self, feature: str) -> int:
+        """إضافة عمود جديد لخاصية لم تظهر من قبل"""
+        idx = len(self.feature_names)
+        self.feature_index[feature] = idx
+        self.feature_names.append(feature)
+        for row in self.weight_matrix:
+            if row is not None:
+                row.append(0.0)
+        return idx
+
+    def get_weight_row(self, emotion: str) -> List[float]:
+        """صف أوزان المشاعر (يُنشأ عند أول تعلم)"""
+        idx = self.emotion_index.get(emotion)
+        if idx is None:
+            idx = len(self.weight_matrix)
+            self.emotion_index[emotion] = idx
+            self.weight_matrix.append(None)
+        
+        row = self.weight_matrix[idx]
+        if row is None:
+            row = self.weight_matrix[idx] = [0.0] * len(self.feature_names)
+        return row
+
+    def calculate_emotion_probabilities(self, features: Dict[str, float]) -> List[float]:
+        """حساب احتماليات كل المشاعر بناءً على الخصائص (بنفس ترتيب emotion_types)"""
+        x = list(map(features.get, self.feature_names, repeat(0.0)))
         
-        emotion_weights = self.situation_emotion_map[emotion]
-        probability = 0.0
+        # الأوزان المتعلمة × الخصائص، مع تطبيع القيمة بين 0 و 1
+        probabilities = _score_rows(self.weight_matrix[:len(self.emotion_types)], x)
         
-        for feature, value in features.items():
-            if feature in emotion_weights:
-                probability += value * emotion_weights[feature]
+        # إذا لم نتعلم عن مشاعر بعد، نستخدم القيم الافتراضية
+        for i, probability in enumerate(probabilities):
+            if probability is None:
+                probabilities[i] = self.calculate_default_emotion_probability(self.emotion_types[i], features)
         
-        # تطبيع القيمة بين 0 و 1
-        return max(0.0, min(1.0, probability))
+        return probabilities
 
     def calculate_default_emotion_probability(self, emotion: str, features: Dict[str, float]) -> float:
         """حساب احتمالية افتراضية للمشاعر الجديدة"""
@@ -295,20 +486,19 @@ class ContextualEmotionEngine:
         factors = {}
         
         # تحديد العامل المهيمن
-        if features.get("tone_aggressive", 0) > 0.5:
-            factors["dominant_tone"] = "عدواني"
-        elif features.get("tone_sarcastic", 0) > 0.5:
-            factors["dominant_tone"] = "ساخر"
-        elif features.get("tone_affectionate", 0) > 0.5:
-            factors["dominant_tone"] = "حنون"
-        else:
-            factors["dominant_tone"] = "محايد"
+        factors["dominant_tone"] = "محايد"
+        for key, tone in self._tone_keys:
+            if features.get(key, 0) > 0.5:
+                factors["dominant_tone"] = tone
+                break
         
         # تحديد السياق الاجتماعي
-        social_scores = {k: v for k, v in features.items() if k.startswith("social_")}
-        if social_scores:
-            dominant_social = max(social_scores.keys(), key=lambda k: social_scores[k])
-            factors["social_context"] = dominant_social.replace("social_", "")
+        best_score = None
+        for key, context in self._social_keys:
+            score = features.get(key)
+            if score is not None and (best_score is None or score > best_score):
+                best_score = score
+                factors["social_context"] = context
         
         # تحديد مستوى التفاعل
         interaction_level = features.get("exclamation_marks", 0) + features.get("question_marks", 0)
@@ -325,9 +515,14 @@ class ContextualEmotionEngine:
                               actual_response_type: str, feedback_score: float = 0.5):
         """التعلم من التفاعل"""
         
-        # استخراج خصائص هذا التفاعل
-        features = self.extract_context_features(user_input, 
-                                               [item['user_input'] for item in self.conversation_history])
+        # استخراج خصائص هذا التفاعل (أو إعادة استخدامها من التوقع السابق لنفس الرسالة)
+        if self._last_features is not None and self._last_features[0] == user_input:
+            features = self._last_features[1]
+        else:
+            recent_tokens = [item.tokens for item in islice(reversed(self.conversation_history), 3)]
+            recent_tokens.reverse()
+            features = self.extract_context_features(user_input, recent_tokens)
+        self._last_features = None
         
         # إنشاء سياق المشاعر
         emotion_context = EmotionContext(
@@ -339,15 +534,25 @@ class ContextualEmotionEngine:
             confidence=feedback_score
         )
         
+        # تحديث المجاميع الجارية قبل أن يُسقط التاريخ أقدم عنصر
+        if len(self.conversation_history) == self.conversation_history.maxlen:
+            evicted = self.conversation_history[0].predicted_emotion
+            self._emotion_counts[evicted] -= 1
+            if not self._emotion_counts[evicted]:
+                del self._emotion_counts[evicted]
+        self._emotion_counts[predicted_emotion] += 1
+        self._recent_feedback.append(feedback_score)
+        
         # إضافة للتاريخ
-        self.conversation_history.append({
-            'user_input': user_input,
-            'predicted_emotion': predicted_emotion,
-            'response_type': actual_response_type,
-            'feedback_score': feedback_score,
-            'timestamp': datetime.now(),
-            'features': features
-        })
+        self.conversation_history.append(HistoryEntry(
+            user_input=user_input,
+            predicted_emotion=predicted_emotion,
+            response_type=actual_response_type,
+            feedback_score=feedback_score,
+            timestamp=datetime.now(),
+            features=features,
+            tokens=_token_set(user_input)
+        ))
         
         # تحديث النماذج المتعلمة
         self.update_emotion_weights(predicted_emotion, features, feedback_score)
@@ -361,15 +566,20 @@ class ContextualEmotionEngine:
         learning_rate = 0.1  # معدل التعلم
         
         # تحديث الأوزان للمشاعر المتوقعة
+        row = None
         for feature, value in features.items():
             if value > 0:  # فقط الخصائص الموجودة
+                if row is None:
+                    row = self.get_weight_row(emotion)
+                idx = self.feature_index.get(feature)
+                if idx is None:
+                    idx = self.add_feature(feature)
+                
                 # زيادة الوزن إذا كان التوقع صحيحاً، تقليله إذا كان خاطئاً
                 adjustment = learning_rate * feedback_score * value
-                self.situation_emotion_map[emotion][feature] += adjustment
                 
                 # الحد من النمو المفرط
-                self.situation_emotion_map[emotion][feature] = max(-1.0, 
-                    min(1.0, self.situation_emotion_map[emotion][feature]))
+                row[idx] = max(-1.0, min(1.0, row[idx] + adjustment))
 
     def update_learning_stats(self):
         """تحديث إحصائيات التعلم"""
@@ -378,77 +588,121 @@ class ContextualEmotionEngine:
         
         # حساب دقة التوقع من آخر 20 محادثة
         if len(self.conversation_history) >= 20:
-            recent_feedback = [item['feedback_score'] for item in list(self.conversation_history)[-20:]]
-            self.learning_stats["emotion_accuracy"] = sum(recent_feedback) / len(recent_feedback)
+            self.learning_stats["emotion_accuracy"] = sum(self._recent_feedback) / len(self._recent_feedback)
+
+    def rebuild_history_aggregates(self):
+        """إعادة بناء المجاميع الجارية من تاريخ المحادثات (بعد التحميل)"""
+        self._emotion_counts = Counter(
+            item.predicted_emotion for item in self.conversation_history
+        )
+        self._recent_feedback = deque(
+            (item.feedback_score for item in islice(reversed(self.conversation_history), 20)),
+            maxlen=20
+        )
+        self._recent_feedback.reverse()
 
     def get_contextual_response_suggestion(self, predicted_emotion: str, 
                                          context_factors: Dict[str, str]) -> str:
         """اقتراح نوع الرد المناسب للسياق"""
         
-        response_mapping = {
-            ("سعادة", "congratulations"): "celebration",
-            ("حزن", "complaint"): "empathy", 
-            ("غضب", "عدواني"): "calming",
-            ("ازدراء", "ساخر"): "playful_deflection",
-            ("حماس", "عالي"): "matching_energy",
-            ("خيبة أمل", "disappointment"): "encouragement"
-        }
-        
         # البحث عن تطابق في السياق
         social_context = context_factors.get("social_context", "")
         dominant_tone = context_factors.get("dominant_tone", "")
         
         # محاولة العثور على تطابق مباشر
-        for (emotion, context), response_type in response_mapping.items():
-            if predicted_emotion == emotion and (context in social_context or context in dominant_tone):
+        for context, response_type in self._response_by_emotion.get(predicted_emotion, ()):
+            if context in social_context or context in dominant_tone:
                 return response_type
         
         # fallback للمشاعر الأساسية
-        emotion_defaults = {
-            "سعادة": "positive_reinforcement",
-            "حزن": "empathy",
-            "غضب": "calming",
-            "حب": "affectionate",
-            "ازدراء": "respectful_distance",
-            "حماس": "matching_energy"
-        }
-        
-        return emotion_defaults.get(predicted_emotion, "neutral_friendly")
+        return self._emotion_default_responses.get(predicted_emotion, "neutral_friendly")
 
     def save_learning_data(self):
-        """حفظ بيانات التعلم"""
+        """حفظ بيانات التعلم (JSON مضغوط بدل pickle)"""
+        self.write_learning_data(self.snapshot_learning_data())
+
+    def snapshot_learning_data(self) -> bytes:
+        """التقاط بيانات التعلم كـ JSON (الضغط والكتابة في write_learning_data)"""
+        learning_stats = dict(self.learning_stats)
+        if isinstance(learning_stats.get("last_updated"), datetime):
+            learning_stats["last_updated"] = learning_stats["last_updated"].isoformat()
+        
+        history = [item.to_dict() for item in self.conversation_history]
+        
         data = {
-            'situation_emotion_map': dict(self.situation_emotion_map),
+            'emotion_weights': {
+                'emotions': list(self.emotion_index),
+                'features': self.feature_names,
+                'matrix': self.weight_matrix
+            },
             'context_weights': dict(self.context_weights),
-            'learning_stats': self.learning_stats,
-            'conversation_history': list(self.conversation_history)
+            'learning_stats': learning_stats,
+            'conversation_history': history
         }
         
+        return json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+    def write_learning_data(self, payload: bytes):
+        """ضغط بيانات التعلم الملتقطة وكتابتها"""
         os.makedirs(os.path.dirname(self.learning_data_path), exist_ok=True)
         
-        with open(self.learning_data_path, 'wb') as f:
-            pickle.dump(data, f)
+        with gzip.open(self.learning_data_path, 'wb') as f:
+            f.write(payload)
 
     def load_learning_data(self):
         """تحميل بيانات التعلم المحفوظة"""
+        legacy_path = self.learning_data_path.replace('.json.gz', '.pkl')
+        
         if os.path.exists(self.learning_data_path):
-            try:
-                with open(self.learning_data_path, 'rb') as f:
+            path = self.learning_data_path
+        elif legacy_path != self.learning_data_path and os.path.exists(legacy_path):
+            # ترحيل لمرة واحدة من ملف pickle القديم (الحفظ التالي يكتب JSON)
+            path = legacy_path
+        else:
+            return
+        
+        try:
+            if path == legacy_path:
+                with open(path, 'rb') as f:
                     data = pickle.load(f)
-                
-                self.situation_emotion_map = defaultdict(lambda: defaultdict(float), data.get('situation_emotion_map', {}))
-                self.context_weights = defaultdict(float, data.get('context_weights', {}))
-                self.learning_stats = data.get('learning_stats', self.learning_stats)
-                
-                # استعادة تاريخ المحادثة
-                history_data = data.get('conversation_history', [])
-                self.conversation_history = deque(history_data[-100:], maxlen=100)  # آخر 100 محادثة
-                
-            except Exception as e:
-                print(f"خطأ في تحميل بيانات التعلم: {e}")
-                # تهيئة بيانات فارغة في حالة الخطأ
-                self.situation_emotion_map = defaultdict(lambda: defaultdict(float))
-                self.context_weights = defaultdict(float)
+            else:
+                with gzip.open(path, 'rt', encoding='utf-8') as f:
+                    data = json.load(f)
+            
+            self.reset_emotion_weights()
+            if 'emotion_weights' in data:
+                weights = data['emotion_weights']
+                for feature in weights['features']:
+                    self.add_feature(feature)
+                for emotion, row in zip(weights['emotions'], weights['matrix']):
+                    if row is not None:
+                        self.get_weight_row(emotion)[:] = row
+            else:
+                # الصيغة القديمة: قاموس مشاعر -> {خاصية: وزن}
+                for emotion, emotion_weights in data.get('situation_emotion_map', {}).items():
+                    row = self.get_weight_row(emotion)
+                    for feature, weight in emotion_weights.items():
+                        idx = self.feature_index.get(feature)
+                        if idx is None:
+                            idx = self.add_feature(feature)
+                        row[idx] = weight
+            self.context_weights = defaultdict(float, data.get('context_weights', {}))
+            self.learning_stats = data.get('learning_stats', self.learning_stats)
+            if isinstance(self.learning_stats.get("last_updated"), str):
+                self.learning_stats["last_updated"] = datetime.fromisoformat(self.learning_stats["last_updated"])
+            
+            # استعادة تاريخ المحادثة
+            history_data = data.get('conversation_history', [])
+            self.conversation_history = deque(
+                (HistoryEntry.from_dict(item) for item in history_data[-100:]), maxlen=100
+            )  # آخر 100 محادثة
+            self.rebuild_history_aggregates()
+            
+        except Exception as e:
+            print(f"خطأ في تحميل بيانات التعلم: {e}")
+            # تهيئة بيانات فارغة في حالة الخطأ
+            self.reset_emotion_weights()
+            self.context_weights = defaultdict(float)
 
     def get_learning_insights(self) -> Dict:
         """الحصول على إحصائيات التعلم"""
@@ -464,13 +718,7 @@ class ContextualEmotionEngine:
 
     def get_most_common_emotions(self) -> Dict[str, int]:
         """الحصول على أكثر المشاعر شيوعاً"""
-        emotion_counts = {}
-        
-        for interaction in self.conversation_history:
-            emotion = interaction.get('predicted_emotion', 'غير محدد')
-            emotion_counts[emotion] = emotion_counts.get(emotion, 0) + 1
-        
-        return dict(sorted(emotion_counts.items(), key=lambda x: x[1], reverse=True)[:5])
+        return dict(self._emotion_counts.most_common(5))
 
     def calculate_learning_progress(self) -> float:
         """حساب تقدم التعلم"""
@@ -478,23 +726,24 @@ class ContextualEmotionEngine:
             return 0.0
         
         # مقارنة أداء أول 10 محادثات مع آخر 10
-        first_batch = list(self.conversation_history)[:10]
-        last_batch = list(self.conversation_history)[-10:]
+        first_batch = list(islice(self.conversation_history, 10))
+        last_batch = list(islice(reversed(self.conversation_history), 10))
+        last_batch.reverse()
         
-        first_avg = sum(item.get('feedback_score', 0.5) for item in first_batch) / 10
-        last_avg = sum(item.get('feedback_score', 0.5) for item in last_batch) / 10
+        first_avg = sum(item.feedback_score for item in first_batch) / 10
+        last_avg = sum(item.feedback_score for item in last_batch) / 10
         
         return max(0.0, (last_avg - first_avg))
 
     def get_context_importance(self) -> Dict[str, float]:
         """الحصول على أهمية عوامل السياق"""
-        feature_importance = {}
+        rows = [row for row in self.weight_matrix if row is not None]
+        if not rows:
+            return {}
         
-        for emotion, weights in self.situation_emotion_map.items():
-            for feature, weight in weights.items():
-                if feature not in feature_importance:
-                    feature_importance[feature] = 0.0
-                feature_importance[feature] += abs(weight)
+        # مجموع القيم المطلقة لكل عمود (خاصية) عبر كل المشاعر
+        importance = [sum(map(abs, column)) for column in zip(*rows)]
         
         # ترتيب حسب الأهمية
-        return dict(sorted(feature_importance.items(), key=lambda x: x[1], reverse=True)[:10])
\ No newline at end of file
+        top = heapq.nlargest(10, range(len(importance)), key=importance.__getitem__)
+        return {self.feature_names[i]: importance[i] for i in top}
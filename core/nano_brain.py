@@ -1,9 +1,17 @@
 # nano_brain.py - العقل المركزي لنانو
+import atexit
 import json
+import os
+import pickle
+import queue
 import random
-from typing import Dict, List, Tuple, Optional, Any
+import re
+import threading
+from collections import deque
+from itertools import islice
+from typing import Dict, List, Tuple, Optional, Any, NamedTuple
 from dataclasses import dataclass, asdict
-from datetime import datetime
+from datetime import datetime, timedelta
 from pathlib import Path
 
 # استيراد النظم الفرعية
@@ -11,7 +19,118 @@ from .nano_personality import NanoPersonality, PersonalityResponse, PersonalityM
 from .contextual_emotion_engine import ContextualEmotionEngine
 from .neural_response_engine import NeuralResponseEngine, ConversationContext
 
-@dataclass 
+# محاولة استخدام pyahocorasick لمسح كل الكلمات المفتاحية في مرور واحد (والرجوع إلى جدول مسطح عند عدم توفره)
+try:
+    import ahocorasick as _ahocorasick
+except Exception:
+    _ahocorasick = None
+
+# مؤشرات الأسئلة (تُستخدم أيضاً لموضوع "سؤال")
+_QUESTION_INDICATORS = frozenset({"ليش", "إيش", "وش", "كيف", "متى", "وين", "مين"})
+
+# مواضيع المحادثة (ترتيب المفاتيح هو أولوية الموضوع)
+_TOPIC_KEYWORDS = {
+    "تحية": frozenset({"مرحبا", "السلام", "أهلا", "هاي", "صباح", "مساء"}),
+    "مشكلة": frozenset({"مشكلة", "مشكلتي", "متضايق", "زعلان", "تعبان", "صعب"}),
+    "فرح": frozenset({"مبروك", "فرحان", "سعيد", "حققت", "نجحت", "فزت"}),
+    "سؤال": _QUESTION_INDICATORS,
+    "شكر": frozenset({"شكرا", "تسلم", "يعطيك العافية", "كثر خيرك"}),
+    "نقاش": frozenset({"أعتقد", "برأيي", "ما رأيك", "تفكر", "ترى"})
+}
+
+# المواقف الخاصة
+_SPECIAL_TRIGGERS = frozenset({
+    "كل زق", "غبي", "حمار", "اصلع", "ما تفهم",
+    "روح تموت", "خراب", "فاشل"
+})
+
+# مؤشرات أنماط شخصية المستخدم (ترتيب المفاتيح هو ترتيب إضافتها للنقاط)
+_PERSONALITY_PATTERNS = {
+    "friendly": frozenset({"حبيبي", "عزيزي", "والله", "ما شاء الله", "كفو"}),
+    "serious": frozenset({"أرجو", "من فضلك", "أريد", "أحتاج", "أطلب"}),
+    "casual": frozenset({"هاي", "مرحبا", "شلونك", "وش أخبارك", "كيفك"}),
+    "emotional": frozenset({"تعبان", "فرحان", "زعلان", "متضايق", "سعيد"})
+}
+
+# إضافات التلوين حسب مستوى العلاقة وللطبيعية (tuple لأن random.choice يحتاج تسلسلاً)
+_ENDEARMENTS = ("حبيبي", "يا غالي", "عزيزي")
+_NATURAL_ADDITIONS = ("", " يعني", " الصراحة", " والله", " تدري")
+
+# كلمات شائعة لا تدل على موضوع المحادثة
+_STOPWORDS = frozenset({
+    "في", "من", "على", "الى", "إلى", "عن", "مع", "و", "او", "أو", "يا", "ما", "لا",
+    "هو", "هي", "انا", "أنا", "انت", "إنت", "أنت", "هذا", "هذي", "هذه", "اللي", "شي",
+    "the", "a", "an", "is", "to", "and", "of", "i", "you", "it"
+})
+
+# عتبة تغيّر الموضوع: تداخل كلمات أقل من 10% بعد انقطاع أطول من 5 دقائق
+_TOPIC_SHIFT_OVERLAP = 0.1
+_TOPIC_SHIFT_GAP = timedelta(minutes=5)
+
+# عبارات قصيرة (موافقة وشكر وتحية) لا تحتاج تحليل المشاعر ولا المحرك العصبي
+_ACKNOWLEDGEMENTS = frozenset({
+    "ok", "okay", "yes", "no", "hi", "تمام", "شكرا", "تسلم", "هاي", "مرحبا", "اوك", "اوكي", "ايه"
+})
+_ACK_MAX_LENGTH = 8
+_ACK_STRIP_CHARS = " \t\n!?.،؟\u064b"  # المسافات وعلامات الترقيم وتنوين الفتح (شكراً)
+
+# سجل التفاعلات: يُستعاد منه آخر 10 تفاعلات ويُعاد كتابته عندما يتجاوز 500 سطر
+_JOURNAL_RESTORE = 10
+_JOURNAL_MAX_LINES = 500
+
+# أساليب خلط رد الشخصية مع رد النظام العصبي
+def _mix_join(p: str, n: str, rng: random.Random) -> str:
+    return f"{p}، {n}"  # ربط بسيط
+
+def _mix_reverse(p: str, n: str, rng: random.Random) -> str:
+    return f"{n} - {p}"  # عكس الترتيب
+
+def _mix_halves(p: str, n: str, rng: random.Random) -> str:
+    return f"{p[:len(p)//2]} {n}"  # نصف ونصف
+
+def _mix_pick(p: str, n: str, rng: random.Random) -> str:
+    return rng.choice((p, n))  # اختيار عشوائي
+
+_MIXING_STYLES = (_mix_join, _mix_reverse, _mix_halves, _mix_pick)
+
+# إضافات التلوين حسب المزاج
+_SARCASTIC_ADDITION = " 🙄"
+_CHEERFUL_ADDITIONS = (" 😊", " هههه", " والله حلو")
+
+# أوزان الثقة الإجمالية للفكرة (رفع نسبة الشخصية)
+_EMOTION_CONFIDENCE_WEIGHT = 0.3
+_FRIENDLINESS_WEIGHT = 0.5
+_CLARITY_WEIGHT = 0.2
+
+def _blend_confidence(emotion_confidence: float, friendliness: float, clarity: float) -> float:
+    """الجزء العددي من ثقة الفكرة: مزج خطي لثقة المشاعر والود ووضوح الرسالة"""
+    return (emotion_confidence * _EMOTION_CONFIDENCE_WEIGHT +
+            friendliness * _FRIENDLINESS_WEIGHT +
+            clarity * _CLARITY_WEIGHT)
+
+def _atomic_write(path: Path, data: bytes):
+    """كتابة ملف كاملاً أو عدم كتابته (ملف مؤقت ثم os.replace)"""
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+def _keyword_groups():
+    """كل مجموعة كلمات مفتاحية مع (الفئة، التصنيف) الذي تنتمي إليه"""
+    for topic, keywords in _TOPIC_KEYWORDS.items():
+        yield "topic", topic, keywords
+    yield "special", "special", _SPECIAL_TRIGGERS
+    yield "question", "question", _QUESTION_INDICATORS
+    for personality_type, indicators in _PERSONALITY_PATTERNS.items():
+        yield "personality", personality_type, indicators
+
+# تعبير منتظم واحد لكل مجموعة (البحث يجري داخل C بدل حلقة any في بايثون)
+_KEYWORD_RES = tuple(
+    (bucket, label, re.compile("|".join(map(re.escape, sorted(keywords, key=len, reverse=True))), re.IGNORECASE))
+    for bucket, label, keywords in _keyword_groups()
+)
+
+@dataclass(slots=True)
 class NanoThought:
     """فكرة نانو"""
     content: str
@@ -20,7 +139,7 @@ class NanoThought:
     emotion_state: str
     personality_influence: float
 
-@dataclass
+@dataclass(slots=True)
 class NanoResponse:
     """الرد النهائي من نانو"""
     text: str
@@ -31,6 +150,29 @@ class NanoResponse:
     reasoning: str
     thought_process: List[str]
 
+class Interaction(NamedTuple):
+    """تفاعل واحد في ذاكرة المحادثة"""
+    timestamp: float = 0.0  # ثوانٍ منذ epoch
+    user_input: str = ""
+    nano_response: str = ""
+    method_used: str = ""
+    confidence: float = 0.0
+    mood: str = ""
+    emotion: str = "عام"
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "Interaction":
+        """بناء تفاعل من قاموس محفوظ (الحقول الناقصة تأخذ القيم الافتراضية)"""
+        return cls(**{field: data[field] for field in cls._fields if field in data})
+
+@dataclass(slots=True)
+class UserTurn:
+    """مدخل المستخدم بعد تحليله مرة واحدة (نص صغير الأحرف وكلماته والكلمات المفتاحية فيه)"""
+    text: str
+    lower: str
+    words: List[str]
+    keyword_hits: Dict[str, set]
+
 class NanoBrain:
     """العقل المركزي لنانو - يدمج الشخصية والمشاعر والتعلم"""
     
@@ -39,11 +181,14 @@ class NanoBrain:
         
         # النظم الفرعية
         self.personality = NanoPersonality()
-        self.emotion_engine = ContextualEmotionEngine(str(self.data_path / "emotion_learning.pkl"))
+        self.emotion_engine = ContextualEmotionEngine(str(self.data_path / "emotion_learning.json.gz"))
         self.response_engine = NeuralResponseEngine(str(self.data_path))
         
         # ذاكرة المحادثة
-        self.conversation_memory = []
+        self.conversation_memory = deque(maxlen=50)  # الاحتفاظ بآخر 50 تفاعل فقط
+        # أعمدة موازية للحقول التي تُقرأ وحدها (رسائل المستخدم والمشاعر)
+        self._memory_inputs = deque(maxlen=50)
+        self._memory_emotions = deque(maxlen=50)
         self.user_profile = {
             "personality_type": "unknown",
             "relationship_level": 0.5,
@@ -64,26 +209,101 @@ class NanoBrain:
             "mixed_weight": 0.35             # وزن الرد المختلط 35%
         }
         
+        # مولد أرقام عشوائية خاص بالعقل
+        self._rng = random.Random()
+        
         # إحصائيات الأداء
         self.performance_stats = {
             "total_interactions": 0,
             "successful_responses": 0,
             "failed_responses": 0,
             "average_confidence": 0.0,
+            "sum_confidence": 0.0,
             "last_reset": datetime.now()
         }
         
+        # ماسح الكلمات المفتاحية (المواضيع والمواقف الخاصة والأسئلة وأنماط الشخصية)
+        self.build_keyword_scanner()
+        self._last_turn = None
+        
+        # حالة الحفظ: الحالة تُكتب عند تغيرها فقط، والتفاعلات الجديدة تُلحق بسجل منفصل
+        self._dirty = True
+        self._journal_pending = 0
+        self._journal_lines = 0
+        self._journal_reset = False
+        
         # تحميل البيانات المحفوظة
         self.load_brain_state()
+        
+        # الحفظ يجري في خيط خلفي حتى لا يؤخر الردود؛ القفل يمنع حفظ النظم الفرعية أثناء توليد رد
+        self._state_lock = threading.RLock()
+        self._save_queue = queue.Queue()
+        self._save_error = None
+        self._save_closed = False
+        self._save_thread = threading.Thread(target=self._save_worker, name="nano-save", daemon=True)
+        self._save_thread.start()
+        
+        # الخيط الخلفي لا يمنع الخروج، فالحفظ المعلق يُنهى عند إغلاق البرنامج
+        atexit.register(self.flush_and_close)
+
+    def build_keyword_scanner(self):
+        """بناء ماسح واحد لكل الكلمات المفتاحية مع الفئة التي تنتمي إليها كل كلمة"""
+        if _ahocorasick is None:
+            # بدون الأتمتة نستخدم التعابير المنتظمة المجمعة مسبقاً
+            self._kw_automaton = None
+            return
+        
+        keyword_tags = {}  # الكلمة -> [(الفئة، التصنيف)]
+        for bucket, label, keywords in _keyword_groups():
+            for keyword in keywords:
+                keyword_tags.setdefault(keyword, []).append((bucket, label))
+        
+        self._kw_automaton = _ahocorasick.Automaton()
+        for keyword, tags in keyword_tags.items():
+            self._kw_automaton.add_word(keyword, tuple(tags))
+        self._kw_automaton.make_automaton()
+
+    def scan_keywords(self, text: str) -> Dict[str, set]:
+        """مسح النص (بأحرف صغيرة) مرة واحدة وإرجاع التصنيفات المكتشفة لكل فئة"""
+        hits = {}
+        
+        if self._kw_automaton is not None:
+            for _, tags in self._kw_automaton.iter(text):
+                for bucket, label in tags:
+                    hits.setdefault(bucket, set()).add(label)
+        else:
+            for bucket, label, pattern in _KEYWORD_RES:
+                if pattern.search(text):
+                    hits.setdefault(bucket, set()).add(label)
+        
+        return hits
 
-    def think(self, user_input: str, context: Dict = None) -> NanoThought:
-        """عملية التفكير - تحليل المدخل وتوليد الأفكار"""
+    def analyze_input(self, user_input: str) -> UserTurn:
+        """تحليل مدخل المستخدم مرة واحدة في الدورة (يُعاد آخر تحليل إذا كان لنفس النص)"""
+        turn = self._last_turn
+        if turn is None or turn.text != user_input:
+            lower = user_input.lower()
+            turn = UserTurn(user_input, lower, lower.split(), self.scan_keywords(lower))
+            self._last_turn = turn
+        return turn
+
+    def think(self, user_input: str, context: Dict = None,
+              recent_messages: Optional[List[str]] = None) -> NanoThought:
+        """عملية التفكير - تحليل المدخل وتوليد الأفكار (recent_messages: آخر 5 رسائل للمستخدم إن كانت محسوبة)"""
+        
+        if recent_messages is None:
+            recent_messages = self.recent_user_inputs(5)
+            
+            # موضوع جديد بعد انقطاع: لا داعي لتمرير تاريخ لا علاقة له بالرسالة
+            if self.is_topic_shift(user_input, recent_messages):
+                recent_messages = []
         
-        # استخراج سياق المحادثة
-        conversation_context = self.build_conversation_context(user_input)
+        # بداية المحادثة (أو رسائل سابقة فارغة): المحرك يأخذ مساره بدون سياق
+        previous_texts = recent_messages[-5:]
+        if not any(previous_texts):
+            previous_texts = None
         
         # تحليل المشاعر السياقي
-        previous_texts = [msg.get("user_input", "") for msg in self.conversation_memory[-5:]]
         emotion, emotion_confidence, emotion_details = self.emotion_engine.predict_emotion_contextual(
             user_input, previous_texts
         )
@@ -100,10 +320,8 @@ class NanoBrain:
         )
         
         # حساب الثقة الإجمالية (رفع نسبة الشخصية)
-        overall_confidence = (
-            emotion_confidence * 0.3 + 
-            personality_response.friendliness * 0.5 + 
-            situation_assessment["clarity"] * 0.2
+        overall_confidence = _blend_confidence(
+            emotion_confidence, personality_response.friendliness, situation_assessment["clarity"]
         )
         
         return NanoThought(
@@ -114,16 +332,56 @@ class NanoBrain:
             personality_influence=personality_response.stubbornness_level
         )
 
-    def build_conversation_context(self, user_input: str) -> ConversationContext:
+    def remember(self, interaction: Interaction):
+        """إضافة تفاعل للذاكرة وأعمدتها"""
+        self.conversation_memory.append(interaction)
+        self._memory_inputs.append(interaction.user_input)
+        self._memory_emotions.append(interaction.emotion)
+
+    def recent_interactions(self, n: int) -> List[Interaction]:
+        """آخر n تفاعلات من الذاكرة (مثل [-n:] في القائمة)"""
+        # المشي من النهاية يلمس n عناصر فقط بدل تخطي بداية الـ deque
+        recent = list(islice(reversed(self.conversation_memory), n))
+        recent.reverse()
+        return recent
+
+    def recent_user_inputs(self, n: int) -> List[str]:
+        """رسائل المستخدم في آخر n تفاعلات"""
+        recent = list(islice(reversed(self._memory_inputs), n))
+        recent.reverse()
+        return recent
+
+    def is_topic_shift(self, user_input: str, recent_messages: List[str],
+                       now: Optional[datetime] = None) -> bool:
+        """هل بدأ المستخدم موضوعاً جديداً لا علاقة له بالرسائل الأخيرة بعد انقطاع"""
+        last_interaction = self.user_profile["last_interaction"]
+        if not recent_messages or not isinstance(last_interaction, datetime):
+            return False
+        if (now or datetime.now()) - last_interaction < _TOPIC_SHIFT_GAP:
+            return False
+        
+        current_tokens = set(self.analyze_input(user_input).words) - _STOPWORDS
+        recent_tokens = set(" ".join(recent_messages).lower().split()) - _STOPWORDS
+        union = current_tokens | recent_tokens
+        if not union:
+            return False
+        
+        return len(current_tokens & recent_tokens) / len(union) < _TOPIC_SHIFT_OVERLAP
+
+    def build_conversation_context(self, user_input: str,
+                                   recent_messages: Optional[List[str]] = None) -> ConversationContext:
         """بناء سياق المحادثة"""
         
-        recent_messages = [msg.get("user_input", "") for msg in self.conversation_memory[-3:]]
+        if recent_messages is None:
+            recent_messages = self.recent_user_inputs(3)
+        else:
+            recent_messages = recent_messages[-3:]
         
         # تحديد موضوع المحادثة من التاريخ
         conversation_topic = self.detect_conversation_topic(user_input, recent_messages)
         
         # تحديد المشاعر الحالية
-        current_emotion = self.personality.current_mood.value if self.personality.current_mood else "محايد"
+        current_emotion = self.personality.current_mood.label if self.personality.current_mood else "محايد"
         
         return ConversationContext(
             previous_messages=recent_messages,
@@ -136,50 +394,42 @@ class NanoBrain:
     def detect_conversation_topic(self, current_input: str, recent_messages: List[str]) -> str:
         """كشف موضوع المحادثة"""
         
-        # مواضيع محتملة
-        topic_keywords = {
-            "تحية": ["مرحبا", "السلام", "أهلا", "هاي", "صباح", "مساء"],
-            "مشكلة": ["مشكلة", "مشكلتي", "متضايق", "زعلان", "تعبان", "صعب"],
-            "فرح": ["مبروك", "فرحان", "سعيد", "حققت", "نجحت", "فزت"],
-            "سؤال": ["ليش", "إيش", "وش", "كيف", "متى", "وين", "مين"],
-            "شكر": ["شكرا", "تسلم", "يعطيك العافية", "كثر خيرك"],
-            "نقاش": ["أعتقد", "برأيي", "ما رأيك", "تفكر", "ترى"]
-        }
-        
-        # فحص كل الرسائل (الحالية والسابقة)
-        all_text = (current_input + " " + " ".join(recent_messages)).lower()
+        # فحص كل الرسائل (الحالية والسابقة) في مرور واحد، أو الاكتفاء بمسح الرسالة الحالية
+        if recent_messages:
+            all_text = (current_input + " " + " ".join(recent_messages)).lower()
+            topics = self.scan_keywords(all_text).get("topic")
+        else:
+            topics = self.analyze_input(current_input).keyword_hits.get("topic")
         
-        for topic, keywords in topic_keywords.items():
-            if any(keyword in all_text for keyword in keywords):
-                return topic
+        if topics:
+            for topic in _TOPIC_KEYWORDS:
+                if topic in topics:
+                    return topic
         
         return "عام"
 
     def assess_situation(self, user_input: str, emotion: str, personality_response: PersonalityResponse) -> Dict:
         """تقييم الموقف الإجمالي"""
         
+        turn = self.analyze_input(user_input)
         assessment = {
-            "complexity": len(user_input.split()) / 10.0,  # تعقيد السؤال
+            "complexity": len(turn.words) / 10.0,  # تعقيد السؤال
             "urgency": 0.5,  # الإلحاح (افتراضي)
             "clarity": 0.8,  # وضوح الرسالة
             "emotional_intensity": personality_response.stubbornness_level,
             "requires_special_handling": False
         }
         
-        # تحديد المواقف الخاصة
-        special_triggers = [
-            "كل زق", "غبي", "حمار", "اصلع", "ما تفهم", 
-            "روح تموت", "خراب", "فاشل"
-        ]
+        hits = turn.keyword_hits
         
-        if any(trigger in user_input.lower() for trigger in special_triggers):
+        # تحديد المواقف الخاصة
+        if "special" in hits:
             assessment["requires_special_handling"] = True
             assessment["urgency"] = 1.0
             assessment["emotional_intensity"] = 1.0
         
         # تحديد مستوى التعقيد
-        question_indicators = ["ليش", "إيش", "وش", "كيف", "متى", "وين", "مين"]
-        if any(indicator in user_input.lower() for indicator in question_indicators):
+        if "question" in hits:
             assessment["complexity"] += 0.3
         
         return assessment
@@ -195,7 +445,7 @@ class NanoBrain:
         thoughts.append(f"المشاعر المكتشفة: {emotion}")
         
         # تحليل الشخصية
-        thoughts.append(f"المزاج الحالي: {personality_response.mood.value}")
+        thoughts.append(f"المزاج الحالي: {personality_response.mood.label}")
         
         # تقييم الموقف
         if situation_assessment["requires_special_handling"]:
@@ -227,7 +477,7 @@ class NanoBrain:
             reasoning_parts.append(f"أقوى العوامل العاطفية: {[f[0] for f in top_features]}")
         
         # تفسير الشخصية
-        reasoning_parts.append(f"نبرة الشخصية: {personality_response.mood.value}")
+        reasoning_parts.append(f"نبرة الشخصية: {personality_response.mood.label}")
         
         if personality_response.stubbornness_level > 0.5:
             reasoning_parts.append("مستوى العناد مرتفع")
@@ -240,12 +490,32 @@ class NanoBrain:
 
     def generate_response(self, user_input: str, context: Dict = None) -> NanoResponse:
         """توليد الرد النهائي"""
+        with self._state_lock:
+            return self._generate_response(user_input, context)
+
+    def _generate_response(self, user_input: str, context: Dict = None) -> NanoResponse:
+        """توليد الرد النهائي (يُستدعى والقفل محجوز)"""
+        
+        # وقت واحد للدورة كلها (الذاكرة وملف المستخدم وكشف تغيّر الموضوع)
+        now = datetime.now()
+        
+        # العبارات القصيرة مثل "تمام" و"شكراً" يكفيها رد الشخصية
+        normalized = self.analyze_input(user_input).lower.strip(_ACK_STRIP_CHARS)
+        if len(normalized) <= _ACK_MAX_LENGTH and normalized in _ACKNOWLEDGEMENTS:
+            return self.respond_to_acknowledgement(user_input, now)
+        
+        # رسائل المستخدم الأخيرة تُجمع مرة واحدة للتفكير وسياق الرد
+        recent_messages = self.recent_user_inputs(5)
+        
+        # موضوع جديد بعد انقطاع: لا داعي لتمرير تاريخ لا علاقة له بالرسالة
+        if self.is_topic_shift(user_input, recent_messages, now):
+            recent_messages = []
         
         # مرحلة التفكير
-        thought = self.think(user_input, context)
+        thought = self.think(user_input, context, recent_messages)
         
         # بناء سياق المحادثة للرد
-        conversation_context = self.build_conversation_context(user_input)
+        conversation_context = self.build_conversation_context(user_input, recent_messages)
         
         # توليد مرشحين للرد
         candidate_responses = []
@@ -256,7 +526,7 @@ class NanoBrain:
             personality_response.text,
             "personality",
             1.15,  # رفع أولوية الشخصية إلى 40%
-            personality_response.mood.value
+            personality_response.mood.label
         ))
         
         # 2. من محرك التعلم الذكي
@@ -272,7 +542,7 @@ class NanoBrain:
             ))
         
         # 3. رد مختلط (دمج الشخصية والذكاء بنسبة أقل)
-        if random.random() < 0.25:  # تقليل احتمال الدمج لرفع نسبة الشخصية
+        if self._rng.random() < 0.25:  # تقليل احتمال الدمج لرفع نسبة الشخصية
             mixed_response = self.create_mixed_response(personality_response.text, 
                                                       candidate_responses[-1][0] if len(candidate_responses) > 1 else "")
             candidate_responses.append((
@@ -293,36 +563,63 @@ class NanoBrain:
             text=final_text,
             confidence=best_response[2],
             method_used=best_response[1],
-            personality_mood=personality_response.mood.value,
+            personality_mood=personality_response.mood.label,
             emotion_detected=thought.emotion_state,
             reasoning=thought.reasoning,
             thought_process=[thought.content]
         )
         
         # حفظ في الذاكرة والتعلم
-        self.save_interaction(user_input, nano_response)
+        self.save_interaction(user_input, nano_response, now)
         
         # التعلم من التفاعل
         self.learn_from_interaction(user_input, nano_response)
         
         return nano_response
 
+    def respond_to_acknowledgement(self, user_input: str, now: Optional[datetime] = None) -> NanoResponse:
+        """رد سريع على عبارة قصيرة بدون محرك المشاعر ولا المحرك العصبي"""
+        
+        personality_response = self.personality.get_personality_response(user_input)
+        mood = personality_response.mood.label
+        
+        thought = NanoThought(
+            content="عبارة قصيرة - رد الشخصية يكفي",
+            confidence=personality_response.friendliness,
+            reasoning=f"نبرة الشخصية: {mood}",
+            emotion_state="محايد",
+            personality_influence=personality_response.stubbornness_level
+        )
+        
+        best_response = self.select_final_response(
+            [(personality_response.text, "personality", 1.15, mood)], thought, user_input
+        )
+        final_text = self.apply_personality_coloring(best_response[0], personality_response, thought)
+        
+        nano_response = NanoResponse(
+            text=final_text,
+            confidence=best_response[2],
+            method_used=best_response[1],
+            personality_mood=mood,
+            emotion_detected=thought.emotion_state,
+            reasoning=thought.reasoning,
+            thought_process=[thought.content]
+        )
+        
+        # يُحفظ في الذاكرة ويُحسب في الإحصائيات، لكن بلا تعلم النظم الفرعية (لا معنى لتقييم رد على "تمام")
+        self.save_interaction(user_input, nano_response, now)
+        self.update_performance_stats(nano_response)
+        
+        return nano_response
+
     def create_mixed_response(self, personality_text: str, neural_text: str) -> str:
         """إنشاء رد مختلط بين الشخصية والذكاء"""
         
         if not neural_text or len(neural_text.strip()) < 3:
             return personality_text
         
-        # أساليب الخلط
-        mixing_styles = [
-            lambda p, n: f"{p}، {n}",  # ربط بسيط
-            lambda p, n: f"{n} - {p}",  # عكس الترتيب
-            lambda p, n: f"{p[:len(p)//2]} {n}",  # نصف ونصف
-            lambda p, n: random.choice([p, n])  # اختيار عشوائي
-        ]
-        
-        mixing_style = random.choice(mixing_styles)
-        return mixing_style(personality_text, neural_text)
+        mixing_style = self._rng.choice(_MIXING_STYLES)
+        return mixing_style(personality_text, neural_text, self._rng)
 
     def select_final_response(self, candidates: List[Tuple[str, str, float, str]], 
                              thought: NanoThought, user_input: str) -> Tuple[str, str, float, str]:
@@ -331,8 +628,11 @@ class NanoBrain:
         if not candidates:
             return ("فهمت كلامك", "fallback", 0.3, "احتياطي")
         
-        # تطبيق معايير الاختيار
-        scored_candidates = []
+        # تطبيق معايير الاختيار في مرور واحد مع تتبع الأفضل (عند التعادل يبقى الأسبق)
+        best_candidate = None
+        best_score = float("-inf")
+        personality_influence = thought.personality_influence
+        memory_size = len(self.conversation_memory)
         
         for text, method, confidence, mood in candidates:
             score = confidence
@@ -343,10 +643,10 @@ class NanoBrain:
             
             if method == "personality":
                 score += 0.4  # رفع مكافأة الشخصية إلى 40%
-                if thought.personality_influence > 0.7:
+                if personality_influence > 0.7:
                     score += 0.3  # مكافأة إضافية في المواقف العاطفية
             
-            if method.startswith("neural") and len(self.conversation_memory) > 5:
+            elif memory_size > 5 and method.startswith("neural"):
                 score += 0.05  # تخفيض مكافأة التعلم
             
             # عقوبات
@@ -356,10 +656,10 @@ class NanoBrain:
             if len(text.strip()) < 3:  # تجنب الردود الفارغة
                 score -= 0.5
             
-            scored_candidates.append((text, method, score, mood))
+            if score > best_score:
+                best_score = score
+                best_candidate = (text, method, score, mood)
         
-        # اختيار الأفضل
-        best_candidate = max(scored_candidates, key=lambda x: x[2])
         return best_candidate
 
     def apply_personality_coloring(self, response: str, personality_response: PersonalityResponse, 
@@ -367,70 +667,73 @@ class NanoBrain:
         """تطبيق التلوين الشخصي النهائي"""
         
         colored_response = response
+        rand = self._rng.random
+        choice = self._rng.choice
+        
+        mood = personality_response.mood
         
         # إضافات حسب المزاج
-        if personality_response.mood == PersonalityMood.SARCASTIC:
-            if random.random() < 0.3:
-                colored_response += " 🙄"
+        if mood == PersonalityMood.SARCASTIC:
+            if rand() < 0.3:
+                colored_response += _SARCASTIC_ADDITION
         
-        elif personality_response.mood == PersonalityMood.CHEERFUL:
-            if random.random() < 0.4:
-                colored_response += random.choice([" 😊", " هههه", " والله حلو"])
+        elif mood == PersonalityMood.CHEERFUL:
+            if rand() < 0.4:
+                colored_response += choice(_CHEERFUL_ADDITIONS)
         
-        elif personality_response.mood == PersonalityMood.STUBBORN:
-            if random.random() < 0.5:
+        elif mood == PersonalityMood.STUBBORN:
+            if rand() < 0.5:
                 colored_response = f"خلاص، {colored_response}"
         
         # إضافات حسب مستوى العلاقة
         if self.user_profile["relationship_level"] > 0.8:
-            endearments = ["حبيبي", "يا غالي", "عزيزي"]
-            if random.random() < 0.3:
-                colored_response += f" {random.choice(endearments)}"
+            if rand() < 0.3:
+                colored_response += f" {choice(_ENDEARMENTS)}"
         
         # إضافات عشوائية للطبيعية
-        natural_additions = ["", " يعني", " الصراحة", " والله", " تدري"]
-        if random.random() < 0.2:
-            prefix = random.choice(natural_additions)
+        if rand() < 0.2:
+            prefix = choice(_NATURAL_ADDITIONS)
             if prefix:
                 colored_response = f"{prefix} {colored_response}"
         
         return colored_response.strip()
 
-    def save_interaction(self, user_input: str, nano_response: NanoResponse):
+    def save_interaction(self, user_input: str, nano_response: NanoResponse,
+                         now: Optional[datetime] = None):
         """حفظ التفاعل في الذاكرة"""
         
-        interaction = {
-            "timestamp": datetime.now(),
-            "user_input": user_input,
-            "nano_response": nano_response.text,
-            "method_used": nano_response.method_used,
-            "confidence": nano_response.confidence,
-            "mood": nano_response.personality_mood,
-            "emotion": nano_response.emotion_detected
-        }
-        
-        self.conversation_memory.append(interaction)
-        
-        # الاحتفاظ بآخر 50 تفاعل فقط
-        if len(self.conversation_memory) > 50:
-            self.conversation_memory.pop(0)
+        if now is None:
+            now = datetime.now()
+        
+        self.remember(Interaction(
+            now.timestamp(),
+            user_input,
+            nano_response.text,
+            nano_response.method_used,
+            nano_response.confidence,
+            nano_response.personality_mood,
+            nano_response.emotion_detected
+        ))
+        self._journal_pending += 1
         
         # تحديث ملف المستخدم
-        self.update_user_profile(user_input, nano_response)
+        self.update_user_profile(user_input, nano_response, now)
 
-    def update_user_profile(self, user_input: str, nano_response: NanoResponse):
+    def update_user_profile(self, user_input: str, nano_response: NanoResponse,
+                            now: Optional[datetime] = None):
         """تحديث ملف المستخدم"""
         
-        self.user_profile["interaction_count"] += 1
-        self.user_profile["last_interaction"] = datetime.now()
+        self._dirty = True
+        profile = self.user_profile
+        profile["interaction_count"] += 1
+        profile["last_interaction"] = now or datetime.now()
         
         # تحديث مستوى العلاقة تدريجياً
-        if nano_response.confidence > 0.7:
-            self.user_profile["relationship_level"] = min(1.0, 
-                self.user_profile["relationship_level"] + 0.02)
-        elif nano_response.confidence < 0.4:
-            self.user_profile["relationship_level"] = max(0.1,
-                self.user_profile["relationship_level"] - 0.01)
+        confidence = nano_response.confidence
+        if confidence > 0.7:
+            profile["relationship_level"] = min(1.0, profile["relationship_level"] + 0.02)
+        elif confidence < 0.4:
+            profile["relationship_level"] = max(0.1, profile["relationship_level"] - 0.01)
         
         # تحليل نمط شخصية المستخدم
         self.analyze_user_personality(user_input)
@@ -438,49 +741,39 @@ class NanoBrain:
     def analyze_user_personality(self, user_input: str):
         """تحليل شخصية المستخدم من طريقة كلامه"""
         
-        # مؤشرات أنماط الشخصية
-        patterns = {
-            "friendly": ["حبيبي", "عزيزي", "والله", "ما شاء الله", "كفو"],
-            "serious": ["أرجو", "من فضلك", "أريد", "أحتاج", "أطلب"],
-            "casual": ["هاي", "مرحبا", "شلونك", "وش أخبارك", "كيفك"],
-            "emotional": ["تعبان", "فرحان", "زعلان", "متضايق", "سعيد"]
-        }
-        
-        text_lower = user_input.lower()
+        matched_types = self.analyze_input(user_input).keyword_hits.get("personality")
+        if not matched_types:
+            return
         
-        for personality_type, indicators in patterns.items():
-            if any(indicator in text_lower for indicator in indicators):
+        preference_patterns = self.user_profile["preference_patterns"]
+        for personality_type in _PERSONALITY_PATTERNS:
+            if personality_type in matched_types:
                 # زيادة النقاط لهذا النوع
-                if personality_type not in self.user_profile["preference_patterns"]:
-                    self.user_profile["preference_patterns"][personality_type] = 0
-                
-                self.user_profile["preference_patterns"][personality_type] += 1
+                count = preference_patterns.get(personality_type, 0) + 1
+                preference_patterns[personality_type] = count
                 
-                # تحديث نوع الشخصية الرئيسي
-                max_type = max(self.user_profile["preference_patterns"].items(), 
-                             key=lambda x: x[1])[0]
-                self.user_profile["personality_type"] = max_type
+                # تحديث نوع الشخصية الرئيسي (النوع الوحيد الذي يمكن أن يتجاوز الأعلى هو الذي زاد للتو)
+                max_type, max_count = self._personality_argmax
+                if count > max_count or (count == max_count and personality_type != max_type and
+                                         self._precedes(preference_patterns, personality_type, max_type)):
+                    self._personality_argmax = (personality_type, count)
+                self.user_profile["personality_type"] = self._personality_argmax[0]
+
+    @staticmethod
+    def _precedes(preference_patterns: Dict, first: str, second: str) -> bool:
+        """هل أُضيف النوع الأول قبل الثاني (عند التعادل يفوز الأسبق كما في max)"""
+        for key in preference_patterns:
+            if key == first:
+                return True
+            if key == second:
+                return False
+        return False
 
     def learn_from_interaction(self, user_input: str, nano_response: NanoResponse):
         """التعلم من التفاعل الحالي"""
         
         # تحديث إحصائيات الأداء
-        self.performance_stats["total_interactions"] += 1
-        
-        if nano_response.confidence > 0.6:
-            self.performance_stats["successful_responses"] += 1
-            feedback_score = nano_response.confidence
-        else:
-            self.performance_stats["failed_responses"] += 1
-            feedback_score = nano_response.confidence
-        
-        # حساب متوسط الثقة
-        total_responses = (self.performance_stats["successful_responses"] + 
-                          self.performance_stats["failed_responses"])
-        self.performance_stats["average_confidence"] = (
-            (self.performance_stats["average_confidence"] * (total_responses - 1) + 
-             nano_response.confidence) / total_responses
-        )
+        feedback_score = self.update_performance_stats(nano_response)
         
         # تمرير التعلم للنظم الفرعية
         self.response_engine.learn_from_feedback(
@@ -493,12 +786,30 @@ class NanoBrain:
             nano_response.method_used, feedback_score
         )
 
+    def update_performance_stats(self, nano_response: NanoResponse) -> float:
+        """تحديث إحصائيات الأداء وإرجاع درجة التقييم"""
+        self._dirty = True
+        stats = self.performance_stats
+        stats["total_interactions"] += 1
+        
+        feedback_score = nano_response.confidence
+        if feedback_score > 0.6:
+            stats["successful_responses"] += 1
+        else:
+            stats["failed_responses"] += 1
+        
+        # حساب متوسط الثقة (مجموع تراكمي بدل إعادة ضرب المتوسط في العدد)
+        stats["sum_confidence"] += feedback_score
+        stats["average_confidence"] = stats["sum_confidence"] / stats["total_interactions"]
+        
+        return feedback_score
+
     def get_system_status(self) -> Dict:
         """الحصول على حالة النظام"""
         
         return {
             "personality": {
-                "current_mood": self.personality.current_mood.value,
+                "current_mood": self.personality.current_mood.label,
                 "stubbornness_level": self.personality.stubbornness_level,
                 "energy_level": self.personality.energy_level,
                 "patience_level": self.personality.patience_level
@@ -512,87 +823,237 @@ class NanoBrain:
             "performance": self.performance_stats.copy(),
             "conversation": {
                 "messages_count": len(self.conversation_memory),
-                "topics_discussed": list(set(msg.get("emotion", "عام") 
-                                           for msg in self.conversation_memory[-10:]))
+                "topics_discussed": list(set(islice(reversed(self._memory_emotions), 10)))
             }
         }
 
     def reset_conversation(self):
         """إعادة تعيين المحادثة"""
-        self.conversation_memory.clear()
-        self.personality.patience_level = 0.6
-        self.personality.current_mood = PersonalityMood.FRIENDLY
+        with self._state_lock:
+            self.conversation_memory.clear()
+            self._memory_inputs.clear()
+            self._memory_emotions.clear()
+            self._journal_pending = 0
+            self._journal_reset = True
+            self.personality.patience_level = 0.6
+            self.personality.current_mood = PersonalityMood.FRIENDLY
 
     def save_brain_state(self):
-        """حفظ حالة العقل"""
-        brain_state = {
-            "user_profile": self.user_profile,
-            "behavior_settings": self.behavior_settings,
-            "performance_stats": self.performance_stats,
-            "conversation_memory": [
-                {**msg, "timestamp": msg["timestamp"].isoformat()} 
-                for msg in self.conversation_memory[-10:]  # آخر 10 فقط
-            ]
-        }
+        """حفظ حالة العقل في الخلفية (تُلتقط نسخة من الحالة الآن وتُكتب الملفات في خيط الحفظ)"""
+        with self._state_lock:
+            brain_state = None
+            if self._dirty:
+                brain_state = pickle.dumps({
+                    "user_profile": self.user_profile,
+                    "behavior_settings": self.behavior_settings,
+                    "performance_stats": self.performance_stats
+                }, protocol=5)
+                self._dirty = False
+            
+            journal = self.take_journal_entries()
+            
+            # الطلب يدخل الطابور تحت القفل حتى لا يصل بعد علامة الإيقاف في flush_and_close
+            closed = self._save_closed
+            if not closed:
+                self._save_queue.put((brain_state, journal))
+        
+        # خيط الحفظ متوقف (بعد flush_and_close): الكتابة تجري مباشرة
+        if closed:
+            self.write_snapshots([(brain_state, journal)])
+
+    def take_journal_entries(self) -> Optional[Tuple[str, str]]:
+        """التفاعلات التي لم تُحفظ بعد كأسطر JSON مع طريقة الكتابة ("a" إلحاق، "w" إعادة كتابة)"""
+        pending = min(self._journal_pending, len(self.conversation_memory))
+        
+        # بعد إعادة التعيين أو عند تضخم السجل يُعاد كتابته بآخر التفاعلات فقط
+        if self._journal_reset or self._journal_lines + pending > _JOURNAL_MAX_LINES:
+            entries = self.recent_interactions(_JOURNAL_RESTORE)
+            mode = "w"
+            self._journal_lines = 0
+        elif pending:
+            entries = self.recent_interactions(pending)
+            mode = "a"
+        else:
+            return None
+        
+        self._journal_lines += len(entries)
+        self._journal_pending = 0
+        self._journal_reset = False
+        
+        return mode, "".join(json.dumps(msg._asdict(), ensure_ascii=False) + "\n" for msg in entries)
+
+    def _save_worker(self):
+        """خيط الحفظ: يدمج طلبات الحفظ المتراكمة في كتابة واحدة"""
+        while True:
+            jobs = [self._save_queue.get()]
+            while True:
+                try:
+                    jobs.append(self._save_queue.get_nowait())
+                except queue.Empty:
+                    break
+            
+            try:
+                snapshots = [job for job in jobs if job is not None]
+                if snapshots:
+                    self.write_snapshots(snapshots)
+            except Exception as e:
+                self._save_error = e
+                print(f"خطأ في حفظ حالة العقل: {e}")
+            finally:
+                for _ in jobs:
+                    self._save_queue.task_done()
+            
+            if None in jobs:
+                return
+
+    def write_snapshots(self, snapshots: List[Tuple[Optional[bytes], Optional[Tuple[str, str]]]]):
+        """كتابة آخر حالة ملتقطة وكل إضافات السجل بالترتيب، ثم حفظ النظم الفرعية"""
+        brain_state = None
+        journal_writes = []
+        for state, journal in snapshots:
+            if state is not None:
+                brain_state = state
+            if journal is not None:
+                if journal[0] == "w":
+                    journal_writes = [journal]
+                else:
+                    journal_writes.append(journal)
         
         # إنشاء مجلد البيانات
         self.data_path.mkdir(exist_ok=True)
         
-        # حفظ حالة العقل
-        with open(self.data_path / "brain_state.json", "w", encoding="utf-8") as f:
-            json.dump(brain_state, f, ensure_ascii=False, indent=2, default=str)
-        
-        # حفظ النظم الفرعية
-        self.emotion_engine.save_learning_data()
-        self.response_engine.save_learned_data()
+        # حفظ حالة العقل (ملف مؤقت ثم استبدال ذري)
+        if brain_state is not None:
+            _atomic_write(self.data_path / "brain_state.pkl", brain_state)
+        
+        journal_path = self.data_path / "interactions.jsonl"
+        for mode, data in journal_writes:
+            if mode == "w":
+                _atomic_write(journal_path, data.encode("utf-8"))
+            else:
+                with open(journal_path, "a", encoding="utf-8") as f:
+                    f.write(data)
+        
+        # التقاط بيانات النظم الفرعية تحت القفل (بدون توليد رد في نفس اللحظة)، ثم كتابتها بعد تحريره
+        with self._state_lock:
+            emotion_data = self.emotion_engine.snapshot_learning_data()
+            learned_data = self.response_engine.snapshot_learned_data()
+        self.emotion_engine.write_learning_data(emotion_data)
+        self.response_engine.write_learned_data(learned_data)
+
+    def flush_saves(self):
+        """انتظار انتهاء كل طلبات الحفظ المعلقة (يرفع آخر خطأ حفظ إن فشل أحدها)"""
+        self._save_queue.join()
+        error, self._save_error = self._save_error, None
+        if error is not None:
+            raise error
+
+    def flush_and_close(self):
+        """إنهاء الحفظ المعلق وإيقاف الخيوط الخلفية (عند الإغلاق)"""
+        atexit.unregister(self.flush_and_close)
+        with self._state_lock:
+            self._save_closed = True
+        if self._save_thread.is_alive():
+            self._save_queue.put(None)
+            self._save_thread.join()
 
     def load_brain_state(self):
         """تحميل حالة العقل"""
-        brain_state_path = self.data_path / "brain_state.json"
-        
-        if brain_state_path.exists():
-            try:
-                with open(brain_state_path, "r", encoding="utf-8") as f:
+        brain_state_path = self.data_path / "brain_state.pkl"
+        legacy_path = self.data_path / "brain_state.json"
+        journal_path = self.data_path / "interactions.jsonl"
+        
+        try:
+            if brain_state_path.exists():
+                with open(brain_state_path, "rb") as f:
+                    brain_state = pickle.load(f)
+                self._dirty = False
+            elif legacy_path.exists():
+                # ترحيل لمرة واحدة من ملف JSON القديم (يُكتب بالصيغة الجديدة عند الحفظ التالي)
+                with open(legacy_path, "r", encoding="utf-8") as f:
                     brain_state = json.load(f)
+                self._journal_reset = True
+            else:
+                brain_state = {}
+            
+            self.user_profile.update(brain_state.get("user_profile", {}))
+            self.behavior_settings.update(brain_state.get("behavior_settings", {}))
+            
+            performance_stats = brain_state.get("performance_stats", {})
+            self.performance_stats.update(performance_stats)
+            if "sum_confidence" not in performance_stats:
+                # الحالات القديمة تحفظ المتوسط فقط
+                self.performance_stats["sum_confidence"] = (
+                    self.performance_stats["average_confidence"] * self.performance_stats["total_interactions"]
+                )
+            
+            last_interaction = self.user_profile.get("last_interaction")
+            if isinstance(last_interaction, str):
+                self.user_profile["last_interaction"] = datetime.fromisoformat(last_interaction)
+            
+            # استعادة الذاكرة (آخر التفاعلات من السجل، أو من الملف القديم)
+            memory_data = brain_state.get("conversation_memory", [])
+            if journal_path.exists():
+                with open(journal_path, "rb") as f:
+                    data = f.read()
                 
-                self.user_profile.update(brain_state.get("user_profile", {}))
-                self.behavior_settings.update(brain_state.get("behavior_settings", {}))
-                self.performance_stats.update(brain_state.get("performance_stats", {}))
-                
-                # استعادة الذاكرة
-                memory_data = brain_state.get("conversation_memory", [])
-                for msg in memory_data:
-                    if "timestamp" in msg and isinstance(msg["timestamp"], str):
-                        msg["timestamp"] = datetime.fromisoformat(msg["timestamp"])
-                    self.conversation_memory.append(msg)
+                # سطر أخير بلا نهاية انقطعت كتابته: يُحذف حتى لا يلتصق به الإلحاق التالي
+                complete = data.rfind(b"\n") + 1
+                if complete < len(data):
+                    with open(journal_path, "r+b") as f:
+                        f.truncate(complete)
                 
-            except Exception as e:
-                print(f"خطأ في تحميل حالة العقل: {e}")
+                lines = data[:complete].decode("utf-8").splitlines()
+                self._journal_lines += len(lines)
+                memory_data = []
+                for line in lines[-_JOURNAL_RESTORE:]:
+                    try:
+                        memory_data.append(json.loads(line))
+                    except json.JSONDecodeError:
+                        continue
+            
+            for msg in memory_data:
+                # السجلات القديمة تحفظ الوقت بصيغة ISO
+                if isinstance(msg.get("timestamp"), str):
+                    msg["timestamp"] = datetime.fromisoformat(msg["timestamp"]).timestamp()
+                self.remember(Interaction.from_dict(msg))
+            
+        except Exception as e:
+            print(f"خطأ في تحميل حالة العقل: {e}")
+        
+        # النوع الأعلى نقاطاً يُحسب مرة واحدة ثم يُحدّث تدريجياً
+        preference_patterns = self.user_profile["preference_patterns"]
+        if preference_patterns:
+            self._personality_argmax = max(preference_patterns.items(), key=lambda x: x[1])
+        else:
+            self._personality_argmax = (None, 0)
 
     def get_debug_info(self, user_input: str) -> Dict:
         """معلومات التشخيص للمطورين"""
         
-        # تشغيل التفكير
-        thought = self.think(user_input)
-        
-        debug_info = {
-            "input_analysis": {
-                "word_count": len(user_input.split()),
-                "character_count": len(user_input),
-                "detected_keywords": self.response_engine.extract_keywords(user_input)
-            },
-            "thought_process": {
-                "content": thought.content,
-                "confidence": thought.confidence,
-                "reasoning": thought.reasoning,
-                "emotion_state": thought.emotion_state
-            },
-            "system_state": self.get_system_status(),
-            "conversation_context": {
-                "recent_messages": len(self.conversation_memory),
-                "relationship_level": self.user_profile["relationship_level"],
-                "user_personality": self.user_profile["personality_type"]
+        # تحت القفل حتى لا يتداخل مع توليد رد أو التقاط حالة الحفظ
+        with self._state_lock:
+            # تشغيل التفكير
+            thought = self.think(user_input)
+            
+            debug_info = {
+                "input_analysis": {
+                    "word_count": len(user_input.split()),
+                    "character_count": len(user_input),
+                    "detected_keywords": self.response_engine.extract_keywords(user_input)
+                },
+                "thought_process": {
+                    "content": thought.content,
+                    "confidence": thought.confidence,
+                    "reasoning": thought.reasoning,
+                    "emotion_state": thought.emotion_state
+                },
+                "system_state": self.get_system_status(),
+                "conversation_context": {
+                    "recent_messages": len(self.conversation_memory),
+                    "relationship_level": self.user_profile["relationship_level"],
+                    "user_personality": self.user_profile["personality_type"]
+                }
             }
-        }
-        
-        return debug_info
\ No newline at end of file
+            
+            return debug_info
\ No newline at end of file
@@ -1,21 +1,115 @@
 # nano_personality.py - شخصية نانو الطبيعية والعنيدة
 import random
-from enum import Enum
+import re
+import sys
+import time
+from random import randrange
+from collections import deque
+from enum import IntEnum
+from functools import lru_cache
 from typing import Dict, List, Optional, Tuple
 from dataclasses import dataclass
 
-class PersonalityMood(Enum):
-    """حالات نانو النفسية"""
-    CHEERFUL = "مرح"          # مرح ولعوب
-    STUBBORN = "عنيد"         # عنيد ومتمسك برأيه
-    SARCASTIC = "ساخر"        # ساخر ومتهكم
-    FRIENDLY = "ودود"         # ودود ومتفهم
-    ANNOYED = "متضايق"        # متضايق ومو راضي
-    PLAYFUL = "مشاكس"         # مشاكس ومتسلي
-    SERIOUS = "جاد"           # جاد ومركز
-    LAZY = "كسلان"           # كسلان ومو متحمس
-
-@dataclass
+# محاولة استخدام pyahocorasick لتصنيف المدخل في مرور واحد (والرجوع إلى الفحص العادي عند عدم توفره)
+try:
+    import ahocorasick as _ahocorasick
+except Exception:
+    _ahocorasick = None
+
+# كلمات كل نوع من المدخلات (الترتيب هو أولوية التصنيف) - مخزنة كنصوص موحدة (interned)
+_CATEGORY_KEYWORDS = tuple((category, tuple(map(sys.intern, words))) for category, words in (
+    ("criticism", ("غبي", "حمار", "فاشل", "كل زق", "اصلع")),       # الإهانات والسباب
+    ("compliment", ("كفو", "شاطر", "بطل", "ممتاز", "رائع")),       # المجاملات
+    ("demand", ("سوي", "اعمل", "جيب", "روح", "قول")),              # الأوامر المباشرة
+    ("request", ("ممكن", "تقدر", "لو سمحت", "أرجو")),              # الطلبات المهذبة
+    ("bragging", ("أنا أذكى", "أنا الأفضل", "أعرف كل شي")),        # الغرور والتفاخر
+    ("sad", ("زعلان", "حزين", "متضايق", "تعبان"))                  # الحزن
+))
+
+def _build_category_automaton():
+    """أتمتة واحدة لكل الكلمات؛ قيمة الكلمة هي أعلى أولوية لتصنيف تنتمي إليه"""
+    if _ahocorasick is None:
+        return None
+    automaton = _ahocorasick.Automaton()
+    for index, (_, words) in enumerate(_CATEGORY_KEYWORDS):
+        for word in words:
+            if word not in automaton:
+                automaton.add_word(word, index)
+    automaton.make_automaton()
+    return automaton
+
+_CATEGORY_AUTOMATON = _build_category_automaton()
+
+# بدون الأتمتة: تعبير منتظم واحد لكل تصنيف (مسح واحد بدل فحص كل عبارة على حدة)
+_CATEGORY_RES = tuple(
+    (category, re.compile("|".join(map(re.escape, words))))
+    for category, words in _CATEGORY_KEYWORDS
+)
+
+def _match_category(text_lower: str) -> Optional[str]:
+    """أعلى تصنيف أولوية ظهرت إحدى كلماته في النص (أو None)"""
+    if _CATEGORY_AUTOMATON is not None:
+        best = min((index for _, index in _CATEGORY_AUTOMATON.iter(text_lower)), default=None)
+        return None if best is None else _CATEGORY_KEYWORDS[best][0]
+    
+    for category, pattern in _CATEGORY_RES:
+        if pattern.search(text_lower):
+            return category
+    return None
+
+# رسائل من كلمة مفتاحية واحدة ("كفو"، "غبي") تُصنف بفحص قاموس بدل المسح
+# (المطابقة بالنص الجزئي تبقى للباقي لأن السوابق العربية مثل "ال" و"و" تلتصق بالكلمة)
+_KEYWORD_CATEGORY = {
+    word: _match_category(word)
+    for _, words in _CATEGORY_KEYWORDS
+    for word in words
+}
+
+# الإهانات الشديدة اللي تخلي نانو عنيد (بحث واحد بدل فحصين)
+_SEVERE_INSULTS_RE = re.compile("غبي|حمار")
+
+@lru_cache(maxsize=512)
+def _classify_text(normalized: str) -> Optional[str]:
+    """الجزء الثابت من تصنيف المدخل (بدون التكرار والمواضيع المفضلة) مع ذاكرة للرسائل المتكررة"""
+    category = _KEYWORD_CATEGORY.get(normalized)
+    return category if category is not None else _match_category(normalized)
+
+class PersonalityMood(IntEnum):
+    """حالات نانو النفسية (أرقام للمقارنة السريعة والاسم العربي في label)"""
+    CHEERFUL = 1          # مرح ولعوب
+    STUBBORN = 2          # عنيد ومتمسك برأيه
+    SARCASTIC = 3         # ساخر ومتهكم
+    FRIENDLY = 4          # ودود ومتفهم
+    ANNOYED = 5           # متضايق ومو راضي
+    PLAYFUL = 6           # مشاكس ومتسلي
+    SERIOUS = 7           # جاد ومركز
+    LAZY = 8              # كسلان ومو متحمس
+
+    @property
+    def label(self) -> str:
+        """الاسم العربي للمزاج"""
+        return _MOOD_LABELS[self]
+
+_MOOD_LABELS = {
+    PersonalityMood.CHEERFUL: "مرح",
+    PersonalityMood.STUBBORN: "عنيد",
+    PersonalityMood.SARCASTIC: "ساخر",
+    PersonalityMood.FRIENDLY: "ودود",
+    PersonalityMood.ANNOYED: "متضايق",
+    PersonalityMood.PLAYFUL: "مشاكس",
+    PersonalityMood.SERIOUS: "جاد",
+    PersonalityMood.LAZY: "كسلان",
+}
+
+# انتقالات المزاج حسب نوع المدخل: (المزاجات المحتملة، تغير العناد، تغير الصبر، تغير الصداقة)
+_MOOD_TRANSITIONS = {
+    "criticism": ((PersonalityMood.STUBBORN, PersonalityMood.SARCASTIC), 0.2, -0.3, 0.0),
+    "compliment": ((PersonalityMood.CHEERFUL,), 0.0, 0.0, 0.1),
+    "repetition": ((PersonalityMood.ANNOYED,), 0.0, -0.2, 0.0),
+    "demand": ((PersonalityMood.STUBBORN,), 0.3, 0.0, 0.0),  # الأوامر المباشرة تخلي نانو عنيد
+}
+
+@dataclass(slots=True, frozen=True)
 class PersonalityResponse:
     """رد فعل الشخصية"""
     text: str
@@ -24,23 +118,199 @@ class PersonalityResponse:
     sarcasm_level: float      # من 0 إلى 1
     friendliness: float       # من 0 إلى 1
 
+# مجموعات الردود الثابتة (تبنى مرة واحدة بدل إنشاء قائمة جديدة في كل رد)
+# رفض الأوامر بعناد
+_STUBBORN_DEMAND_REPLIES = (
+    "ليش أسوي كذا؟ مو راضي",
+    "لا ما أبي، خلاص قررت",
+    "وش المشكلة لو ما سويت؟",
+    "مو مقتنع، جيب لي سبب أقوى",
+    "خلاص انتهيت من هذا الموضوع",
+)
+
+# الرد العنيد على النقد
+_STUBBORN_CRITICISM_REPLIES = (
+    "وأنت وش تفهم فيه؟",
+    "طيب وبعدين؟ مو مهم رأيك",
+    "كلامك مو مقنع لي",
+    "خلاص، أنت كذا وأنا كذا",
+    "احترم نفسك شوي",
+)
+
+# الرد الساخر على المجاملة
+_SARCASTIC_COMPLIMENT_REPLIES = (
+    "آه طبعاً، كأني مو عارف",
+    "ما شاء الله، اكتشفت الحين؟",
+    "وربي شكراً على الاكتشاف العظيم",
+    "يا سلام، عبقرية خارقة!",
+)
+
+# ردود التضايق
+_ANNOYED_REPLIES = (
+    "طيب طيب، فهمت",
+    "خلاص يالله، كفاية",
+    "إيش هذا الإلحاح؟",
+    "اهدأ شوي، لا تعصب",
+    "ما عندي صبر اليوم",
+    "خلاص يا شيخ، استوعبت",
+)
+
+# ردود المشاكسة
+_PLAYFUL_REPLIES = (
+    "هههه والله إنك مضحك",
+    "يا مشاكس، وش تبي؟",
+    "لعبتك حلوة بس مو مقنعة",
+    "تبي تشاكسني؟ تعال",
+    "خلاص لعبنا، هات الجد",
+    "حبيبي المشاكس",
+)
+
+# التكاسل عن الأوامر
+_LAZY_DEMAND_REPLIES = (
+    "اليوم ما لي خلق",
+    "بكرة إن شاء الله",
+    "تعبان شوي، ممكن لاحقاً؟",
+    "والله مو متحمس",
+    "خلني أفكر فيها",
+    "أصلاً ما عندي طاقة",
+)
+
+# ردود الكسل
+_LAZY_REPLIES = (
+    "مممم طيب",
+    "إيه... نعم؟",
+    "ماشي يا ورد",
+    "أها...",
+    "زين زين",
+)
+
+# شكر المجاملة بود
+_FRIENDLY_COMPLIMENT_REPLIES = (
+    "هلا والله، تسلم",
+    "يعطيك العافية، كثر خيرك",
+    "الله يخليك، ما قصرت",
+    "حبيبي والله",
+)
+
+# تلبية الطلبات المهذبة
+_FRIENDLY_REQUEST_REPLIES = (
+    "أكيد حبيبي، وش تبي؟",
+    "تأمر، أنا تحت أمرك",
+    "من عيوني، قول",
+    "خدمة ومحبة",
+)
+
+# ردود ودودة عامة
+_FRIENDLY_REPLIES = (
+    "أهلاً وسهلاً",
+    "تسلم يا غالي",
+    "وش أخبارك؟",
+    "كيفك اليوم؟",
+)
+
+# التواضع أمام المجاملة
+_COMPLIMENT_HUMBLE_REPLIES = (
+    "الله يستر، ما سويت شي",
+    "عادي، أي واحد يقدر يسوي كذا",
+    "مو قد كلامك",
+)
+
+# الرد على الإهانات الشديدة
+_SEVERE_CRITICISM_REPLIES = (
+    "احترم نفسك شوي",
+    "إيش هالكلام؟",
+    "ما تستاهل أرد عليك",
+    "خلاص، مو مهم رأيك",
+)
+
+# الرد على النقد الخفيف
+_MILD_CRITICISM_REPLIES = (
+    "طيب وأنت وش رأيك؟",
+    "ممكن، بس ما أدري",
+    "شايف كذا؟ طيب",
+)
+
+# الرد على التكرار
+_REPETITION_REPLIES = (
+    "خلاص فهمت، قلت كذا مرتين",
+    "طيب طيب، استوعبت",
+    "إيش هذا الإلحاح؟",
+    "أها، زين",
+)
+
+# المواضيع المملة
+_BORING_TOPIC_REPLIES = (
+    "مممم... طيب",
+    "ما رأيك في موضوع آخر؟",
+    "زين زين",
+    "وبعدين؟",
+)
+
+# المواضيع الشيقة
+_INTERESTING_TOPIC_REPLIES = (
+    "وربي شي حلو!",
+    "هذا موضوع مثير فعلاً",
+    "ما شاء الله، حدثني أكثر",
+    "يا سلام على هذا الموضوع",
+)
+
+# قبول الأوامر عند انخفاض العناد
+_AGREEABLE_DEMAND_REPLIES = (
+    "طيب، بس ما أقدر أسوي هذا فعلياً",
+    "أكيد، بس محدود القدرات",
+    "من عيوني، بس...",
+)
+
+# ردود التعاطف
+_EMPATHY_REPLIES = (
+    "الله يعينك، وش صار؟",
+    "ليش زعلان؟ حدثني",
+    "إن شاء الله يصير خير",
+    "الله يفرج همك",
+    "كلنا نمر بأيام صعبة",
+    "تبي تتكلم عن اللي يضايقك؟",
+)
+
 class NanoPersonality:
     """شخصية نانو الطبيعية - مثل الأصدقاء الحقيقيين"""
     
+    __slots__ = (
+        "current_mood", "stubbornness_level", "energy_level", "patience_level",
+        "friendship_level", "conversation_history", "_last_user_inputs",
+        "pet_peeves", "favorite_topics",
+        "_mood_responders", "_input_type_responders", "_sarcasm_by_mood",
+        "stubborn_phrases", "sarcastic_replies", "friend_banter",
+    )
+    
     def __init__(self):
         self.current_mood = PersonalityMood.FRIENDLY
         self.stubbornness_level = 0.4  # متوسط العناد
         self.energy_level = 0.7
         self.patience_level = 0.6
         self.friendship_level = 0.8
-        self.conversation_history = []
-        self.pet_peeves = []  # الأشياء الي تزعجه
-        self.favorite_topics = ["تقنية", "ألعاب", "كوميديا", "طبخ"]
+        self.conversation_history = deque(maxlen=10)  # آخر 10 محادثات فقط
+        self._last_user_inputs = deque(maxlen=3)  # لكشف التكرار بدون بناء قائمة كل مرة
+        self.pet_peeves = frozenset()  # الأشياء الي تزعجه
+        self.favorite_topics = frozenset(sys.intern(topic) for topic in ("تقنية", "ألعاب", "كوميديا", "طبخ"))
         
-        # ردود فعل طبيعية مثل الأصدقاء
-        self.natural_reactions = {
-            "compliment": self.handle_compliment,
-            "criticism": self.handle_criticism
+        # توجيه الرد ومستوى السخرية حسب المزاج (بحث واحد بدل سلسلة if/elif)
+        self._mood_responders = {
+            PersonalityMood.STUBBORN: self.get_stubborn_response,
+            PersonalityMood.SARCASTIC: self.get_sarcastic_response,
+            PersonalityMood.ANNOYED: self.get_annoyed_response,
+            PersonalityMood.PLAYFUL: self.get_playful_response,
+            PersonalityMood.LAZY: self.get_lazy_response,
+        }
+        # أنواع مدخلات ردها ثابت ويتغلب على المزاج (الغرور، الحزن، الطلبات المهذبة)
+        self._input_type_responders = {
+            "bragging": self.get_sarcastic_response,
+            "sad": self.get_empathy_response,
+            "request": self.get_friendly_response,
+        }
+        self._sarcasm_by_mood = {
+            PersonalityMood.SARCASTIC: 0.9,
+            PersonalityMood.STUBBORN: 0.6,
+            PersonalityMood.ANNOYED: 0.4,
         }
         
         # العبارات الطبيعية للصديق العنيد
@@ -87,15 +357,18 @@ class NanoPersonality:
         
         # تعديل المزاج حسب الموقف
         self.update_mood(user_input, input_type)
+        mood = self.current_mood
         
-        # إنتاج الرد المناسب
-        response_text = self.generate_personality_response(user_input, input_type)
+        # إنتاج الرد المناسب ومستوى السخرية من نفس المزاج في مرور واحد
+        responder = self._input_type_responders.get(input_type)
+        if responder is None:
+            responder = self._mood_responders.get(mood, self.get_friendly_response)
         
         return PersonalityResponse(
-            text=response_text,
-            mood=self.current_mood,
+            text=responder(input_type),
+            mood=mood,
             stubbornness_level=self.stubbornness_level,
-            sarcasm_level=self.calculate_sarcasm_level(),
+            sarcasm_level=self._sarcasm_by_mood.get(mood, 0.1),
             friendliness=self.friendship_level
         )
 
@@ -103,52 +376,32 @@ class NanoPersonality:
         """تحليل نوع المدخل"""
         text_lower = text.lower()
         
-        # كشف الإهانات والسباب
-        if any(word in text_lower for word in ["غبي", "حمار", "فاشل", "كل زق", "اصلع"]):
-            return "criticism"
-        # كشف المجاملات    
-        elif any(word in text_lower for word in ["كفو", "شاطر", "بطل", "ممتاز", "رائع"]):
-            return "compliment"
-        # كشف الأوامر المباشرة
-        elif any(word in text_lower for word in ["سوي", "اعمل", "جيب", "روح", "قول"]):
-            return "demand"
-        # كشف الطلبات المهذبة
-        elif any(word in text_lower for word in ["ممكن", "تقدر", "لو سمحت", "أرجو"]):
-            return "request"
-        # كشف الغرور والتفاخر
-        elif any(phrase in text_lower for phrase in ["أنا أذكى", "أنا الأفضل", "أعرف كل شي"]):
-            return "bragging"
-        # كشف الحزن
-        elif any(word in text_lower for word in ["زعلان", "حزين", "متضايق", "تعبان"]):
-            return "sad"
+        # كشف الإهانات والمجاملات والأوامر والطلبات والتفاخر والحزن في مرور واحد
+        category = _classify_text(text_lower.strip())
+        if category is not None:
+            return category
         # كشف التكرار
-        elif text in [msg.get("user", "") for msg in self.conversation_history[-3:]]:
+        elif text in self._last_user_inputs:
             return "repetition"
-        # مواضيع مثيرة
-        elif any(topic in text_lower for topic in self.favorite_topics):
+        # مواضيع مثيرة (كلمة مطابقة تكفي، وإلا نبحث داخل النص مثل "التقنية")
+        elif (not self.favorite_topics.isdisjoint(text_lower.split())
+              or any(topic in text_lower for topic in self.favorite_topics)):
             return "interesting_topic"
         else:
             return "general"
 
     def update_mood(self, user_input: str, input_type: str):
         """تحديث المزاج حسب الموقف"""
-        if input_type == "criticism":
-            self.current_mood = random.choice([PersonalityMood.STUBBORN, PersonalityMood.SARCASTIC])
-            self.stubbornness_level = min(1.0, self.stubbornness_level + 0.2)
-            self.patience_level = max(0.1, self.patience_level - 0.3)
-            
-        elif input_type == "compliment":
-            self.current_mood = PersonalityMood.CHEERFUL
-            self.friendship_level = min(1.0, self.friendship_level + 0.1)
-            
-        elif input_type == "repetition":
-            self.current_mood = PersonalityMood.ANNOYED
-            self.patience_level = max(0.1, self.patience_level - 0.2)
-            
-        elif input_type == "demand":
-            # الأوامر المباشرة تخلي نانو عنيد
-            self.current_mood = PersonalityMood.STUBBORN
-            self.stubbornness_level = min(1.0, self.stubbornness_level + 0.3)
+        transition = _MOOD_TRANSITIONS.get(input_type)
+        if transition is not None:
+            moods, d_stubborn, d_patience, d_friendship = transition
+            self.current_mood = moods[0] if len(moods) == 1 else random.choice(moods)
+            if d_stubborn:
+                self.stubbornness_level = min(1.0, self.stubbornness_level + d_stubborn)
+            if d_patience:
+                self.patience_level = max(0.1, self.patience_level + d_patience)
+            if d_friendship:
+                self.friendship_level = min(1.0, self.friendship_level + d_friendship)
                 
         # استعادة المزاج تدريجياً
         if self.patience_level < 0.8:
@@ -157,259 +410,118 @@ class NanoPersonality:
     def generate_personality_response(self, user_input: str, input_type: str) -> str:
         """توليد رد يعكس الشخصية"""
         
-        # ردود على الغرور
-        if input_type == "bragging":
-            return self.get_sarcastic_response(input_type)
-        # ردود على الحزن
-        elif input_type == "sad":
-            return self.get_empathy_response(input_type)
-        # ردود على الطلبات المهذبة (تتغلب على العناد)
-        elif input_type == "request":
-            return self.get_friendly_response(input_type)
-        
-        elif self.current_mood == PersonalityMood.STUBBORN:
-            return self.get_stubborn_response(input_type)
-            
-        elif self.current_mood == PersonalityMood.SARCASTIC:
-            return self.get_sarcastic_response(input_type)
-            
-        elif self.current_mood == PersonalityMood.ANNOYED:
-            return self.get_annoyed_response(input_type)
-            
-        elif self.current_mood == PersonalityMood.PLAYFUL:
-            return self.get_playful_response(input_type)
-            
-        elif self.current_mood == PersonalityMood.LAZY:
-            return self.get_lazy_response(input_type)
-            
-        else:  # FRIENDLY or others
-            return self.get_friendly_response(input_type)
+        # ردود الغرور والحزن والطلبات المهذبة (تتغلب على العناد)
+        responder = self._input_type_responders.get(input_type)
+        if responder is None:
+            # حسب المزاج (FRIENDLY والباقي ودود)
+            responder = self._mood_responders.get(self.current_mood, self.get_friendly_response)
+        return responder(input_type)
 
     def get_stubborn_response(self, input_type: str) -> str:
         """ردود عنيدة طبيعية"""
         if input_type == "demand":
-            return random.choice([
-                "ليش أسوي كذا؟ مو راضي",
-                "لا ما أبي، خلاص قررت",
-                "وش المشكلة لو ما سويت؟",
-                "مو مقتنع، جيب لي سبب أقوى",
-                "خلاص انتهيت من هذا الموضوع"
-            ])
+            return _STUBBORN_DEMAND_REPLIES[randrange(len(_STUBBORN_DEMAND_REPLIES))]
         elif input_type == "criticism":
-            return random.choice([
-                "وأنت وش تفهم فيه؟",
-                "طيب وبعدين؟ مو مهم رأيك",
-                "كلامك مو مقنع لي",
-                "خلاص، أنت كذا وأنا كذا",
-                "احترم نفسك شوي"
-            ])
+            return _STUBBORN_CRITICISM_REPLIES[randrange(len(_STUBBORN_CRITICISM_REPLIES))]
         else:
-            return random.choice(self.stubborn_phrases)
+            phrases = self.stubborn_phrases
+            return phrases[randrange(len(phrases))]
 
     def get_sarcastic_response(self, input_type: str) -> str:
         """ردود ساخرة طبيعية"""
         if input_type == "compliment":
-            return random.choice([
-                "آه طبعاً، كأني مو عارف",
-                "ما شاء الله، اكتشفت الحين؟",
-                "وربي شكراً على الاكتشاف العظيم",
-                "يا سلام، عبقرية خارقة!"
-            ])
+            return _SARCASTIC_COMPLIMENT_REPLIES[randrange(len(_SARCASTIC_COMPLIMENT_REPLIES))]
         else:
-            return random.choice(self.sarcastic_replies)
+            phrases = self.sarcastic_replies
+            return phrases[randrange(len(phrases))]
 
     def get_annoyed_response(self, input_type: str) -> str:
         """ردود متضايق"""
-        return random.choice([
-            "طيب طيب، فهمت",
-            "خلاص يالله، كفاية",
-            "إيش هذا الإلحاح؟",
-            "اهدأ شوي، لا تعصب",
-            "ما عندي صبر اليوم",
-            "خلاص يا شيخ، استوعبت"
-        ])
+        return _ANNOYED_REPLIES[randrange(len(_ANNOYED_REPLIES))]
 
     def get_playful_response(self, input_type: str) -> str:
         """ردود مشاكسة ولعوبة"""
-        return random.choice([
-            "هههه والله إنك مضحك",
-            "يا مشاكس، وش تبي؟",
-            "لعبتك حلوة بس مو مقنعة",
-            "تبي تشاكسني؟ تعال",
-            "خلاص لعبنا، هات الجد",
-            "حبيبي المشاكس"
-        ])
+        return _PLAYFUL_REPLIES[randrange(len(_PLAYFUL_REPLIES))]
 
     def get_lazy_response(self, input_type: str) -> str:
         """ردود كسولة"""
         if input_type == "demand":
-            return random.choice([
-                "اليوم ما لي خلق",
-                "بكرة إن شاء الله",
-                "تعبان شوي، ممكن لاحقاً؟",
-                "والله مو متحمس",
-                "خلني أفكر فيها",
-                "أصلاً ما عندي طاقة"
-            ])
+            return _LAZY_DEMAND_REPLIES[randrange(len(_LAZY_DEMAND_REPLIES))]
         else:
-            return random.choice([
-                "مممم طيب",
-                "إيه... نعم؟",
-                "ماشي يا ورد",
-                "أها...",
-                "زين زين"
-            ])
+            return _LAZY_REPLIES[randrange(len(_LAZY_REPLIES))]
 
     def get_friendly_response(self, input_type: str) -> str:
         """ردود ودودة طبيعية"""
         if input_type == "compliment":
-            return random.choice([
-                "هلا والله، تسلم",
-                "يعطيك العافية، كثر خيرك",
-                "الله يخليك، ما قصرت",
-                "حبيبي والله"
-            ])
+            return _FRIENDLY_COMPLIMENT_REPLIES[randrange(len(_FRIENDLY_COMPLIMENT_REPLIES))]
         elif input_type == "request":
-            return random.choice([
-                "أكيد حبيبي، وش تبي؟",
-                "تأمر، أنا تحت أمرك",
-                "من عيوني، قول",
-                "خدمة ومحبة"
-            ])
+            return _FRIENDLY_REQUEST_REPLIES[randrange(len(_FRIENDLY_REQUEST_REPLIES))]
         else:
-            return random.choice([
-                "أهلاً وسهلاً",
-                "تسلم يا غالي",
-                "وش أخبارك؟",
-                "كيفك اليوم؟"
-            ])
+            return _FRIENDLY_REPLIES[randrange(len(_FRIENDLY_REPLIES))]
 
     def calculate_sarcasm_level(self) -> float:
         """حساب مستوى السخرية"""
-        if self.current_mood == PersonalityMood.SARCASTIC:
-            return 0.9
-        elif self.current_mood == PersonalityMood.STUBBORN:
-            return 0.6
-        elif self.current_mood == PersonalityMood.ANNOYED:
-            return 0.4
-        else:
-            return 0.1
+        return self._sarcasm_by_mood.get(self.current_mood, 0.1)
 
     def handle_compliment(self, text: str) -> str:
         """التعامل مع المجاملات"""
         # أحياناً يقبل المجاملة وأحياناً يكون متواضع أو ساخر
-        reaction_type = random.choices(
-            ["accept", "humble", "sarcastic"], 
-            weights=[0.5, 0.3, 0.2]
-        )[0]
-        
-        if reaction_type == "accept":
-            return random.choice([
-                "هلا والله، تسلم",
-                "يعطيك العافية",
-                "الله يخليك"
-            ])
-        elif reaction_type == "humble":
-            return random.choice([
-                "الله يستر، ما سويت شي",
-                "عادي، أي واحد يقدر يسوي كذا",
-                "مو قد كلامك"
-            ])
+        # أوزان 0.5 / 0.3 / 0.2 كحدود تراكمية على سحب واحد
+        r = random.random()
+        if r < 0.5:  # accept
+            return _FRIENDLY_COMPLIMENT_REPLIES[randrange(len(_FRIENDLY_COMPLIMENT_REPLIES))]
+        elif r < 0.8:  # humble
+            return _COMPLIMENT_HUMBLE_REPLIES[randrange(len(_COMPLIMENT_HUMBLE_REPLIES))]
         else:  # sarcastic
-            return random.choice([
-                "آه طبعاً، كأني مو عارف",
-                "ما شاء الله اكتشفت الحين؟"
-            ])
+            return _SARCASTIC_COMPLIMENT_REPLIES[randrange(len(_SARCASTIC_COMPLIMENT_REPLIES))]
 
     def handle_criticism(self, text: str) -> str:
         """التعامل مع النقد - رد فعل طبيعي"""
-        if "غبي" in text.lower() or "حمار" in text.lower():
+        if _SEVERE_INSULTS_RE.search(text.lower()):
             self.current_mood = PersonalityMood.STUBBORN
-            return random.choice([
-                "احترم نفسك شوي",
-                "إيش هالكلام؟",
-                "ما تستاهل أرد عليك",
-                "خلاص، مو مهم رأيك"
-            ])
+            return _SEVERE_CRITICISM_REPLIES[randrange(len(_SEVERE_CRITICISM_REPLIES))]
         else:
-            return random.choice([
-                "طيب وأنت وش رأيك؟",
-                "ممكن، بس ما أدري",
-                "شايف كذا؟ طيب"
-            ])
+            return _MILD_CRITICISM_REPLIES[randrange(len(_MILD_CRITICISM_REPLIES))]
+
+    # ردود فعل طبيعية مثل الأصدقاء (دوال على مستوى الصنف تستدعى هكذا: natural_reactions[key](self, text))
+    natural_reactions = {
+        "compliment": handle_compliment,
+        "criticism": handle_criticism
+    }
 
     def add_to_conversation_history(self, user_input: str, bot_response: str):
         """إضافة للتاريخ التحاور"""
         self.conversation_history.append({
             "user": user_input,
             "bot": bot_response,
-            "mood": self.current_mood.value,
-            "timestamp": str(random.randint(1000, 9999))  # مبسط للتجربة
+            "mood": _MOOD_LABELS[self.current_mood],
+            "timestamp": time.monotonic_ns()  # للترتيب فقط، بدون استهلاك المولد العشوائي
         })
-        
-        # الاحتفاظ بآخر 10 محادثات فقط
-        if len(self.conversation_history) > 10:
-            self.conversation_history.pop(0)
+        self._last_user_inputs.append(user_input)
 
     def handle_repetition(self, text: str) -> str:
         """التعامل مع التكرار"""
-        return random.choice([
-            "خلاص فهمت، قلت كذا مرتين",
-            "طيب طيب، استوعبت",
-            "إيش هذا الإلحاح؟",
-            "أها، زين"
-        ])
+        return _REPETITION_REPLIES[randrange(len(_REPETITION_REPLIES))]
     
     def handle_boring_topic(self, text: str) -> str:
         """التعامل مع المواضيع المملة"""
-        return random.choice([
-            "مممم... طيب",
-            "ما رأيك في موضوع آخر؟",
-            "زين زين",
-            "وبعدين؟"
-        ])
+        return _BORING_TOPIC_REPLIES[randrange(len(_BORING_TOPIC_REPLIES))]
     
     def handle_interesting_topic(self, text: str) -> str:
         """التعامل مع المواضيع الشيقة"""
-        return random.choice([
-            "وربي شي حلو!",
-            "هذا موضوع مثير فعلاً",
-            "ما شاء الله، حدثني أكثر",
-            "يا سلام على هذا الموضوع"
-        ])
+        return _INTERESTING_TOPIC_REPLIES[randrange(len(_INTERESTING_TOPIC_REPLIES))]
     
     def handle_demand(self, text: str) -> str:
         """التعامل مع الأوامر"""
         if self.stubbornness_level > 0.6:
-            return random.choice([
-                "ليش أسوي كذا؟",
-                "مو راضي، ما لي خلق",
-                "خلاص قررت، مو موافق",
-                "وش المشكلة لو ما سويت؟"
-            ])
+            return _STUBBORN_DEMAND_REPLIES[randrange(len(_STUBBORN_DEMAND_REPLIES))]
         else:
-            return random.choice([
-                "طيب، بس ما أقدر أسوي هذا فعلياً",
-                "أكيد، بس محدود القدرات",
-                "من عيوني، بس..."
-            ])
+            return _AGREEABLE_DEMAND_REPLIES[randrange(len(_AGREEABLE_DEMAND_REPLIES))]
     
     def handle_request(self, text: str) -> str:
         """التعامل مع الطلبات المهذبة"""
-        return random.choice([
-            "أكيد حبيبي، وش تبي؟",
-            "من عيوني، قول",
-            "تأمر، أنا تحت أمرك",
-            "طبعاً، كيف أقدر أساعدك؟"
-        ])
+        return _FRIENDLY_REQUEST_REPLIES[randrange(len(_FRIENDLY_REQUEST_REPLIES))]
     
     def get_empathy_response(self, input_type: str) -> str:
         """ردود متعاطفة"""
-        return random.choice([
-            "الله يعينك، وش صار؟",
-            "ليش زعلان؟ حدثني",
-            "إن شاء الله يصير خير",
-            "الله يفرج همك",
-            "كلنا نمر بأيام صعبة",
-            "تبي تتكلم عن اللي يضايقك؟"
-        ])
+        return _EMPATHY_REPLIES[randrange(len(_EMPATHY_REPLIES))]
@@ -7,10 +7,47 @@ from typing import Dict, List, Tuple, Optional, Set
 from collections import defaultdict, Counter, deque
 from dataclasses import dataclass
 from datetime import datetime
+from functools import lru_cache
+from itertools import islice
+from operator import itemgetter
 import pickle
+import mmap
 import os
+import sys
+import time
 
-@dataclass
+# كلمات غير مهمة لتجاهلها
+_STOP_WORDS = frozenset({
+    "في", "من", "إلى", "على", "عن", "مع", "هذا", "هذه", "ذلك", "تلك",
+    "التي", "اللي", "الي", "وش", "إيش", "ليش", "كيف"
+})
+
+_WORD_RE = re.compile(r'\w+')
+
+# سجل التعلم (إلحاق فقط) بين اللقطات الكاملة، وعدد سجلاته قبل إعادة كتابة اللقطة
+_JOURNAL_FILE = 'learning_journal.jsonl'
+_JOURNAL_COMPACT_RECORDS = 500
+
+# الرموز التعبيرية والكلمات العامية التي تُحذف من النبرة الجدية (مرور واحد)
+_SERIOUS_RE = re.compile("|".join(map(re.escape, ["😊", "😂", "🤣", "😍", "هههه", "والله"])))
+
+def _load_pickle(path: str):
+    """قراءة ملف pickle عبر mmap (فك الترميز من صفحات الملف مباشرة بدون نسخة إضافية)"""
+    with open(path, 'rb') as f:
+        try:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # ملف فارغ لا يمكن ربطه بالذاكرة
+            return pickle.load(f)
+        with mm:
+            return pickle.loads(mm)
+
+@lru_cache(maxsize=4096)
+def _extract_keywords_cached(text: str) -> Tuple[str, ...]:
+    """أهم 5 كلمات مفتاحية في النص (مشتركة بين كل النسخ ومخزنة للنصوص المتكررة)"""
+    keywords = [w for w in _WORD_RE.findall(text.lower()) if w not in _STOP_WORDS and len(w) > 2]
+    return tuple(map(sys.intern, keywords[:5]))
+
+@dataclass(slots=True)
 class ResponsePattern:
     """نمط الرد"""
     input_pattern: List[str]
@@ -19,7 +56,7 @@ class ResponsePattern:
     context_type: str
     emotion_trigger: str
     usage_count: int
-    last_used: datetime
+    last_used: float  # وقت آخر استخدام بالثواني (time.time)
 
 @dataclass
 class ConversationContext:
@@ -38,13 +75,22 @@ class NeuralResponseEngine:
         
         # قاعدة أنماط الردود المتعلمة
         self.response_patterns = []
+        self._pattern_index = defaultdict(list)  # كلمة مفتاحية ← مواقع الأنماط التي تحتويها
+        self._keyword_bits = {}  # كلمة مفتاحية ← رقم البت الخاص بها
+        self._pattern_masks = []  # كلمات كل نمط كعدد صحيح (بت لكل كلمة) لحساب جاكارد بعمليات البت
+        # أعمدة الحقول الثابتة للأنماط (مشاعر ومعدل نجاح) لمسح المرشحين بدون تحميل الكائنات
+        self._pattern_emotions = []
+        self._pattern_success = []
+        self._pattern_positions = {}  # id(النمط) ← موقعه (لتسجيل الاستخدام في السجل)
         self.conversation_contexts = deque(maxlen=200)
         self.successful_interactions = deque(maxlen=500)
+        self._interaction_scores = deque(maxlen=500)  # عمود درجات النجاح الموازي للتفاعلات
         
         # نماذج التعلم
-        self.word_associations = defaultdict(lambda: defaultdict(float))
+        self.word_associations: Dict[str, Counter] = {}
         self.phrase_templates = defaultdict(list)
-        self.context_response_map = defaultdict(lambda: defaultdict(float))
+        self.context_response_map: Dict[str, Counter] = {}
+        self._top_assoc = {}  # أقوى 3 كلمات مرتبطة بكل كلمة (تُحسب عند الحاجة وتُلغى عند التعديل)
         
         # مولد الردود التلقائي
         self.response_generators = {
@@ -61,9 +107,15 @@ class NeuralResponseEngine:
             "last_training": None
         }
         
+        # سجل التعديلات منذ آخر لقطة (لا يُسجل شي أثناء التهيئة والتحميل)
+        self._journaling = False
+        self._journal_pending = []
+        self._journal_records = 0
+        
         # تهيئة النظام
         self.initialize_base_patterns()
         self.load_learned_data()
+        self._journaling = True
 
     def initialize_base_patterns(self):
         """تهيئة أنماط الردود الأساسية للبداية"""
@@ -101,12 +153,22 @@ class NeuralResponseEngine:
                 )
 
     def add_successful_pattern(self, input_sample: str, response: str, 
-                             context_type: str, emotion: str, success_score: float = 1.0):
+                             context_type: str, emotion: str, success_score: float = 1.0,
+                             now: Optional[float] = None):
         """إضافة نمط رد ناجح للتعلم"""
         
+        if now is None:
+            now = time.time()
+        if self._journaling:
+            self._journal_pending.append({
+                "op": "add", "input": input_sample, "response": response, "context": context_type,
+                "emotion": emotion, "score": success_score, "time": now
+            })
+        
         # استخراج الكلمات المفتاحية
         input_words = self.extract_keywords(input_sample)
-        response_words = response.split()
+        # كلمات موحدة (interned): نسخة واحدة لكل كلمة في كل الجداول وفي ملفات الحفظ
+        response_words = list(map(sys.intern, response.split()))
         
         # إنشاء نمط الرد
         pattern = ResponsePattern(
@@ -116,9 +178,10 @@ class NeuralResponseEngine:
             context_type=context_type,
             emotion_trigger=emotion,
             usage_count=1,
-            last_used=datetime.now()
+            last_used=now
         )
         
+        self._index_pattern(len(self.response_patterns), pattern)
         self.response_patterns.append(pattern)
         
         # تحديث خرائط التعلم
@@ -128,39 +191,55 @@ class NeuralResponseEngine:
         # تسجيل التفاعل الناجح
         self.successful_interactions.append({
             'input': input_sample,
+            'input_keywords': frozenset(input_words),  # لتصفية ماركوف بدون إعادة الاستخراج
             'response': response, 
+            'response_words': tuple(response_words),  # كلمات الرد جاهزة لنموذج ماركوف
             'context': context_type,
             'emotion': emotion,
             'success_score': success_score,
-            'timestamp': datetime.now()
+            'timestamp': now
         })
+        self._interaction_scores.append(success_score)
+
+    def _index_pattern(self, index: int, pattern: ResponsePattern):
+        """إضافة نمط للفهرس المعكوس ولأقنعة البت"""
+        mask = 0
+        for keyword in set(pattern.input_pattern):
+            self._pattern_index[keyword].append(index)
+            mask |= 1 << self._keyword_bits.setdefault(keyword, len(self._keyword_bits))
+        self._pattern_masks.append(mask)
+        self._pattern_emotions.append(pattern.emotion_trigger)
+        self._pattern_success.append(pattern.success_rate)
+        self._pattern_positions[id(pattern)] = index
+
+    def _rebuild_pattern_index(self):
+        """إعادة بناء الفهرس المعكوس بعد استبدال قائمة الأنماط"""
+        self._pattern_index = defaultdict(list)
+        self._keyword_bits = {}
+        self._pattern_masks = []
+        self._pattern_emotions = []
+        self._pattern_success = []
+        self._pattern_positions = {}
+        for index, pattern in enumerate(self.response_patterns):
+            self._index_pattern(index, pattern)
 
     def extract_keywords(self, text: str) -> List[str]:
         """استخراج الكلمات المفتاحية المهمة"""
-        
-        # كلمات غير مهمة لتجاهلها
-        stop_words = {
-            "في", "من", "إلى", "على", "عن", "مع", "هذا", "هذه", "ذلك", "تلك",
-            "التي", "التي", "اللي", "الي", "وش", "إيش", "ليش", "كيف"
-        }
-        
-        words = re.findall(r'\w+', text.lower())
-        keywords = [w for w in words if w not in stop_words and len(w) > 2]
-        
-        return keywords[:5]  # أهم 5 كلمات مفتاحية
+        return list(_extract_keywords_cached(text))
 
     def update_word_associations(self, input_words: List[str], response_words: List[str], 
                                 success_score: float):
         """تحديث ترابطات الكلمات"""
         
+        delta = 0.1 * success_score
         for input_word in input_words:
+            associations = self.word_associations.get(input_word)
+            if associations is None:
+                self.word_associations[input_word] = associations = Counter()
             for response_word in response_words:
-                # تقوية الترابط بناءً على النجاح
-                self.word_associations[input_word][response_word] += 0.1 * success_score
-                
-                # تطبيع القيم لتجنب النمو المفرط
-                if self.word_associations[input_word][response_word] > 1.0:
-                    self.word_associations[input_word][response_word] = 1.0
+                # تقوية الترابط بناءً على النجاح (مع تطبيع القيم لتجنب النمو المفرط)
+                associations[response_word] = min(1.0, associations[response_word] + delta)
+            self._top_assoc.pop(input_word, None)
 
     def update_context_mappings(self, context_type: str, emotion: str, 
                                response: str, success_score: float):
@@ -169,7 +248,10 @@ class NeuralResponseEngine:
         context_key = f"{context_type}_{emotion}"
         
         # تحديث قوة الرد في هذا السياق
-        self.context_response_map[context_key][response] += 0.1 * success_score
+        responses = self.context_response_map.get(context_key)
+        if responses is None:
+            self.context_response_map[context_key] = responses = Counter()
+        responses[response] += 0.1 * success_score
 
     def generate_smart_response(self, user_input: str, emotion: str = "محايد", 
                                context: ConversationContext = None) -> Tuple[str, float, str]:
@@ -212,22 +294,44 @@ class NeuralResponseEngine:
         
         similar_patterns = []
         
-        for pattern in self.response_patterns:
-            # حساب التشابه
-            similarity = self.calculate_pattern_similarity(input_keywords, pattern.input_pattern)
+        # الأنماط بدون أي كلمة مشتركة لا تتجاوز الحد حتى مع تطابق المشاعر (0.2)،
+        # لذلك نفحص فقط المرشحين من الفهرس المعكوس وبترتيبهم الأصلي
+        candidates = set()
+        query_mask = 0
+        unknown = 0  # كلمات المدخل غير الموجودة في أي نمط (تدخل في الاتحاد فقط)
+        for keyword in set(input_keywords):
+            bit = self._keyword_bits.get(keyword)
+            if bit is None:
+                unknown += 1
+                continue
+            query_mask |= 1 << bit
+            candidates.update(self._pattern_index[keyword])
+        
+        pattern_masks = self._pattern_masks
+        pattern_emotions = self._pattern_emotions
+        pattern_success = self._pattern_success
+        similarity_by_mask = {}  # الأنماط المتعلمة من نفس المدخل تتشارك نفس القناع
+        for index in sorted(candidates):
+            # حساب التشابه (جاكارد على أقنعة البت، مثل calculate_pattern_similarity) مرة لكل مجموعة كلمات
+            pattern_mask = pattern_masks[index]
+            similarity = similarity_by_mask.get(pattern_mask)
+            if similarity is None:
+                similarity = similarity_by_mask[pattern_mask] = (
+                    (query_mask & pattern_mask).bit_count() / ((query_mask | pattern_mask).bit_count() + unknown)
+                )
             
             # تعديل حسب المشاعر
-            if pattern.emotion_trigger == emotion:
+            if pattern_emotions[index] == emotion:
                 similarity += 0.2
             
-            # إضافة الأنماط المشابهة
+            # إضافة الأنماط المشابهة (مع درجة الترتيب: التشابه × معدل النجاح)
             if similarity > 0.3:  # حد أدنى للتشابه
-                similar_patterns.append((pattern, similarity))
+                similar_patterns.append((similarity * pattern_success[index], index))
         
         # ترتيب حسب التشابه ومعدل النجاح
-        similar_patterns.sort(key=lambda x: x[1] * x[0].success_rate, reverse=True)
+        similar_patterns.sort(key=itemgetter(0), reverse=True)
         
-        return [pattern for pattern, score in similar_patterns[:5]]
+        return [self.response_patterns[index] for score, index in similar_patterns[:5]]
 
     def calculate_pattern_similarity(self, keywords1: List[str], keywords2: List[str]) -> float:
         """حساب التشابه بين مجموعتين من الكلمات المفتاحية"""
@@ -251,22 +355,24 @@ class NeuralResponseEngine:
         if not patterns:
             return self.generate_fallback_response()
         
-        # اختيار نمط بناءً على النجاح والحداثة
-        weights = []
-        for pattern in patterns:
-            # وزن يعتمد على معدل النجاح ومدى الحداثة
-            recency_factor = 1.0 - ((datetime.now() - pattern.last_used).days / 30.0)
-            recency_factor = max(0.1, recency_factor)
-            
-            weight = pattern.success_rate * recency_factor
-            weights.append(weight)
+        # اختيار نمط بناءً على النجاح والحداثة (قراءة الوقت مرة واحدة لكل الأنماط)
+        now = time.time()
+        
+        # وزن يعتمد على معدل النجاح ومدى الحداثة (الأيام الكاملة منذ آخر استخدام)
+        weights = [
+            pattern.success_rate * max(0.1, 1.0 - (((now - pattern.last_used) // 86400) / 30.0))
+            for pattern in patterns
+        ]
         
         # اختيار عشوائي مرجح
         selected_pattern = random.choices(patterns, weights=weights)[0]
         
         # تحديث احصائيات الاستخدام
         selected_pattern.usage_count += 1
-        selected_pattern.last_used = datetime.now()
+        selected_pattern.last_used = now
+        position = self._pattern_positions.get(id(selected_pattern))
+        if self._journaling and position is not None:
+            self._journal_pending.append({"op": "use", "index": position, "time": now})
         
         # إضافة تنويع للرد
         return self.add_variation_to_response(selected_pattern.response_template)
@@ -274,38 +380,36 @@ class NeuralResponseEngine:
     def generate_markov_response(self, keywords: List[str], emotion: str) -> str:
         """توليد رد باستخدام سلاسل ماركوف"""
         
-        # البحث عن جمل تحتوي على كلمات مشابهة
+        # البحث عن جمل تحتوي على كلمات مشابهة وجمع كلماتها لنموذج ماركوف في مرور واحد
+        # (الكلمات المفتاحية وكلمات الرد محسوبة عند التسجيل)
+        keywords = frozenset(keywords)
         relevant_responses = []
+        words = []
         
         for interaction in self.successful_interactions:
-            interaction_keywords = self.extract_keywords(interaction['input'])
-            
-            # فحص التشابه
-            if any(kw in interaction_keywords for kw in keywords):
+            if not keywords.isdisjoint(interaction['input_keywords']):
                 relevant_responses.append(interaction['response'])
+                words.extend(interaction['response_words'])
         
         if not relevant_responses:
             return self.generate_fallback_response()
         
-        # بناء نموذج ماركوف بسيط
-        words = []
-        for response in relevant_responses:
-            words.extend(response.split())
-        
         if len(words) < 3:
             return random.choice(relevant_responses)
         
+        # جدول الانتقالات: كل كلمة ← الكلمات التي تأتي بعدها (بنفس ترتيب ظهورها)
+        transitions = defaultdict(list)
+        for word, next_word in zip(words, islice(words, 1, None)):
+            transitions[word].append(next_word)
+        
         # توليد رد جديد
         generated_words = []
         current_word = random.choice(words)
         generated_words.append(current_word)
         
         for _ in range(random.randint(3, 8)):
-            # العثور على الكلمات التي تأتي بعد الكلمة الحالية
-            next_words = []
-            for i, word in enumerate(words[:-1]):
-                if word == current_word:
-                    next_words.append(words[i + 1])
+            # الكلمات التي تأتي بعد الكلمة الحالية
+            next_words = transitions.get(current_word)
             
             if next_words:
                 current_word = random.choice(next_words)
@@ -321,13 +425,16 @@ class NeuralResponseEngine:
         response_words = []
         
         for keyword in keywords:
-            if keyword in self.word_associations:
+            top_words = self._top_assoc.get(keyword)
+            if top_words is None:
                 # الحصول على أقوى الترابطات
-                associations = self.word_associations[keyword]
-                if associations:
-                    # اختيار أفضل 3 كلمات مرتبطة
-                    top_words = sorted(associations.items(), key=lambda x: x[1], reverse=True)[:3]
-                    response_words.extend([word for word, score in top_words])
+                associations = self.word_associations.get(keyword)
+                if not associations:
+                    continue
+                # اختيار أفضل 3 كلمات مرتبطة (most_common يحافظ على ترتيب الفرز عند التساوي)
+                top_words = [word for word, score in associations.most_common(3)]
+                self._top_assoc[keyword] = top_words
+            response_words.extend(top_words)
         
         if not response_words:
             return self.generate_fallback_response()
@@ -394,9 +501,7 @@ class NeuralResponseEngine:
     def add_serious_tone(self, response: str) -> str:
         """إضافة نبرة جدية"""
         # إزالة الرموز التعبيرية والكلمات العامية
-        response = re.sub(r'[😊😂🤣😍]', '', response)
-        response = response.replace("هههه", "").replace("والله", "")
-        return response.strip()
+        return _SERIOUS_RE.sub("", response).strip()
 
     def generate_general_contextual_response(self, context: ConversationContext) -> str:
         """توليد رد سياقي عام"""
@@ -442,11 +547,12 @@ class NeuralResponseEngine:
         if not candidates:
             return self.generate_fallback_response(), "fallback", 0.3
         
-        # تصفية الردود الفارغة أو غير المناسبة
+        # تصفية الردود الفارغة أو غير المناسبة (وتقييمها مع تحويل المدخل لأحرف صغيرة مرة واحدة)
+        user_input_lower = user_input.lower()
         valid_candidates = []
         for response, method, confidence in candidates:
-            if response and len(response.strip()) > 0 and response != user_input:
-                quality_score = self.evaluate_response_quality(response, user_input)
+            if response and not response.isspace() and response != user_input:
+                quality_score = self._quality_score(response, user_input_lower)
                 adjusted_confidence = confidence * quality_score
                 valid_candidates.append((response, method, adjusted_confidence))
         
@@ -454,33 +560,39 @@ class NeuralResponseEngine:
             return self.generate_fallback_response(), "fallback", 0.3
         
         # اختيار أفضل رد
-        best_candidate = max(valid_candidates, key=lambda x: x[2])
+        best_candidate = max(valid_candidates, key=itemgetter(2))
         return best_candidate
 
     def evaluate_response_quality(self, response: str, user_input: str) -> float:
         """تقييم جودة الرد"""
+        return self._quality_score(response, user_input.lower())
+
+    def _quality_score(self, response: str, user_input_lower: str) -> float:
+        """تقييم جودة الرد بمرور واحد على كلماته"""
         
         quality_score = 1.0
         
         # التحقق من الطول المناسب
-        if len(response) < 3:
+        length = len(response)
+        if length < 3:
             quality_score -= 0.5
-        elif len(response) > 200:
+        elif length > 200:
             quality_score -= 0.2
         
         # التحقق من عدم التكرار المباشر
-        if response.lower() == user_input.lower():
+        response_lower = response.lower()
+        if response_lower == user_input_lower:
             quality_score -= 0.8
         
         # التحقق من وجود كلمات مفيدة
-        meaningful_words = len([w for w in response.split() if len(w) > 2])
+        words = response.split()
+        meaningful_words = sum(1 for w in words if len(w) > 2)
         if meaningful_words < 2:
             quality_score -= 0.3
         
         # تقييم التنوع اللغوي
-        unique_words = len(set(response.lower().split()))
-        total_words = len(response.split())
-        diversity = unique_words / total_words if total_words > 0 else 0
+        total_words = len(words)
+        diversity = len(set(response_lower.split())) / total_words if total_words > 0 else 0
         quality_score += diversity * 0.2
         
         return max(0.1, quality_score)
@@ -520,24 +632,46 @@ class NeuralResponseEngine:
     def reduce_pattern_weight(self, user_input: str, bot_response: str, penalty_score: float):
         """تقليل وزن الأنماط غير الناجحة"""
         
+        if self._journaling:
+            self._journal_pending.append({
+                "op": "reduce", "input": user_input, "response": bot_response, "penalty": penalty_score
+            })
+        
         input_keywords = self.extract_keywords(user_input)
         response_words = bot_response.split()
         
         # تقليل الترابطات
+        factor = 1 - penalty_score * 0.1
         for input_word in input_keywords:
+            self._top_assoc.pop(input_word, None)
+            associations = self.word_associations.get(input_word)
+            if associations is None:
+                continue
             for response_word in response_words:
-                if input_word in self.word_associations and response_word in self.word_associations[input_word]:
-                    self.word_associations[input_word][response_word] *= (1 - penalty_score * 0.1)
+                if response_word in associations:
+                    associations[response_word] *= factor
                     
                     # حذف الترابطات الضعيفة جداً
-                    if self.word_associations[input_word][response_word] < 0.01:
-                        del self.word_associations[input_word][response_word]
+                    if associations[response_word] < 0.01:
+                        del associations[response_word]
 
-    def save_learned_data(self):
-        """حفظ البيانات المتعلمة"""
-        
-        # إنشاء مجلد البيانات إذا لم يكن موجوداً
-        os.makedirs(self.data_path, exist_ok=True)
+    def save_learned_data(self, compact: bool = False):
+        """حفظ البيانات المتعلمة (إلحاق التعديلات الجديدة بالسجل، ولقطة كاملة عند تضخمه)"""
+        self.write_learned_data(self.snapshot_learned_data(compact))
+
+    def snapshot_learned_data(self, compact: bool = False) -> Optional[Tuple[str, object]]:
+        """التقاط ما يجب حفظه: ("append", أسطر السجل) أو ("snapshot", {ملف: بايتات}) أو None (الكتابة في write_learned_data)"""
+        
+        # الحالة الافتراضية: إلحاق التعديلات فقط بدل إعادة كتابة كل الجداول
+        pending = len(self._journal_pending)
+        if (not compact and self._journal_records + pending <= _JOURNAL_COMPACT_RECORDS
+                and os.path.exists(os.path.join(self.data_path, 'word_associations.pkl'))):
+            if not pending:
+                return None
+            lines = "".join(json.dumps(record, ensure_ascii=False) + "\n" for record in self._journal_pending)
+            self._journal_records += pending
+            self._journal_pending = []
+            return "append", lines
         
         # حفظ بيانات مختلفة في ملفات منفصلة
         data_files = {
@@ -558,15 +692,39 @@ class NeuralResponseEngine:
             'successful_interactions.pkl': list(self.successful_interactions)
         }
         
-        for filename, data in data_files.items():
-            filepath = os.path.join(self.data_path, filename)
-            
-            if filename.endswith('.json'):
-                with open(filepath, 'w', encoding='utf-8') as f:
-                    json.dump(data, f, ensure_ascii=False, indent=2, default=str)
-            else:
-                with open(filepath, 'wb') as f:
-                    pickle.dump(data, f)
+        payloads = {
+            filename: (json.dumps(data, ensure_ascii=False, indent=2, default=str).encode('utf-8')
+                       if filename.endswith('.json') else pickle.dumps(data))
+            for filename, data in data_files.items()
+        }
+        
+        # اللقطة تحتوي كل ما في السجل، فيبدأ سجل جديد فارغ
+        self._journal_records = 0
+        self._journal_pending = []
+        return "snapshot", payloads
+
+    def write_learned_data(self, snapshot: Optional[Tuple[str, object]]):
+        """كتابة ما التقطته snapshot_learned_data إلى الملفات"""
+        if snapshot is None:
+            return
+        
+        # إنشاء مجلد البيانات إذا لم يكن موجوداً
+        os.makedirs(self.data_path, exist_ok=True)
+        journal_path = os.path.join(self.data_path, _JOURNAL_FILE)
+        
+        kind, payload = snapshot
+        if kind == "append":
+            with open(journal_path, 'a', encoding='utf-8') as f:
+                f.write(payload)
+            return
+        
+        for filename, data in payload.items():
+            with open(os.path.join(self.data_path, filename), 'wb') as f:
+                f.write(data)
+        
+        # اللقطة تحتوي كل ما في السجل، فيبدأ سجل جديد فارغ
+        with open(journal_path, 'w', encoding='utf-8'):
+            pass
 
     def load_learned_data(self):
         """تحميل البيانات المتعلمة"""
@@ -575,25 +733,28 @@ class NeuralResponseEngine:
             # تحميل ترابطات الكلمات
             word_assoc_path = os.path.join(self.data_path, 'word_associations.pkl')
             if os.path.exists(word_assoc_path):
-                with open(word_assoc_path, 'rb') as f:
-                    data = pickle.load(f)
-                    self.word_associations = defaultdict(lambda: defaultdict(float), data)
+                data = _load_pickle(word_assoc_path)
+                self.word_associations = {word: Counter(scores) for word, scores in data.items()}
+                self._top_assoc = {}
             
             # تحميل خرائط السياق
             context_path = os.path.join(self.data_path, 'context_response_map.pkl')
             if os.path.exists(context_path):
-                with open(context_path, 'rb') as f:
-                    data = pickle.load(f)
-                    self.context_response_map = defaultdict(lambda: defaultdict(float), data)
+                data = _load_pickle(context_path)
+                self.context_response_map = {key: Counter(scores) for key, scores in data.items()}
             
             # تحميل أنماط الردود
             patterns_path = os.path.join(self.data_path, 'response_patterns.pkl')
             if os.path.exists(patterns_path):
-                with open(patterns_path, 'rb') as f:
-                    patterns_data = pickle.load(f)
-                    self.response_patterns = [
-                        ResponsePattern(**pattern_data) for pattern_data in patterns_data
-                    ]
+                patterns_data = _load_pickle(patterns_path)
+                self.response_patterns = [
+                    ResponsePattern(**pattern_data) for pattern_data in patterns_data
+                ]
+                # الملفات القديمة تحفظ وقت الاستخدام كـ datetime
+                for pattern in self.response_patterns:
+                    if isinstance(pattern.last_used, datetime):
+                        pattern.last_used = pattern.last_used.timestamp()
+                self._rebuild_pattern_index()
             
             # تحميل المقاييس
             metrics_path = os.path.join(self.data_path, 'learning_metrics.json')
@@ -604,14 +765,65 @@ class NeuralResponseEngine:
             # تحميل التفاعلات الناجحة
             interactions_path = os.path.join(self.data_path, 'successful_interactions.pkl')
             if os.path.exists(interactions_path):
-                with open(interactions_path, 'rb') as f:
-                    interactions_data = pickle.load(f)
-                    self.successful_interactions = deque(interactions_data[-500:], maxlen=500)
+                interactions_data = _load_pickle(interactions_path)
+                self.successful_interactions = deque(interactions_data[-500:], maxlen=500)
+                self._interaction_scores = deque(
+                    (interaction['success_score'] for interaction in self.successful_interactions), maxlen=500
+                )
+                
+                # الملفات القديمة بدون كلمات مفتاحية محسوبة
+                for interaction in self.successful_interactions:
+                    if 'input_keywords' not in interaction:
+                        interaction['input_keywords'] = frozenset(_extract_keywords_cached(interaction['input']))
+                    if 'response_words' not in interaction:
+                        interaction['response_words'] = tuple(map(sys.intern, interaction['response'].split()))
+                    if isinstance(interaction.get('timestamp'), datetime):
+                        interaction['timestamp'] = interaction['timestamp'].timestamp()
+            
+            # إعادة تطبيق التعديلات المسجلة بعد آخر لقطة
+            journal_path = os.path.join(self.data_path, _JOURNAL_FILE)
+            if os.path.exists(journal_path):
+                self._journal_records = self._replay_journal(journal_path)
                     
         except Exception as e:
             print(f"خطأ في تحميل البيانات المتعلمة: {e}")
             # المتابعة بالبيانات الافتراضية
 
+    def _replay_journal(self, journal_path: str) -> int:
+        """تطبيق سجل التعلم على اللقطة المحملة وإرجاع عدد سجلاته (يتجاهل سطراً انقطعت كتابته)"""
+        
+        with open(journal_path, 'rb') as f:
+            data = f.read()
+        
+        # سطر أخير بلا نهاية انقطعت كتابته: يُحذف حتى لا يلتصق به الإلحاق التالي
+        complete = data.rfind(b"\n") + 1
+        if complete < len(data):
+            with open(journal_path, 'r+b') as f:
+                f.truncate(complete)
+        
+        count = 0
+        for line in data[:complete].decode('utf-8').splitlines():
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            
+            op = record.get("op")
+            if op == "add":
+                self.add_successful_pattern(record["input"], record["response"], record["context"],
+                                            record["emotion"], record["score"], now=record["time"])
+            elif op == "reduce":
+                self.reduce_pattern_weight(record["input"], record["response"], record["penalty"])
+            elif op == "use":
+                index = record["index"]
+                if 0 <= index < len(self.response_patterns):
+                    pattern = self.response_patterns[index]
+                    pattern.usage_count += 1
+                    pattern.last_used = record["time"]
+            count += 1
+        
+        return count
+
     def get_learning_statistics(self) -> Dict:
         """الحصول على إحصائيات التعلم"""
         
@@ -649,16 +861,12 @@ class NeuralResponseEngine:
     def calculate_learning_progress(self) -> float:
         """حساب مدى تقدم التعلم"""
         
-        if len(self.successful_interactions) < 10:
+        scores = self._interaction_scores
+        if len(scores) < 10:
             return 0.0
         
-        # مقارنة أداء أول وآخر مجموعة من التفاعلات
-        interactions_list = list(self.successful_interactions)
-        
-        first_batch = interactions_list[:10]
-        last_batch = interactions_list[-10:]
-        
-        first_avg = sum(i['success_score'] for i in first_batch) / 10
-        last_avg = sum(i['success_score'] for i in last_batch) / 10
+        # مقارنة أداء أول وآخر مجموعة من التفاعلات (قراءة من طرفي عمود الدرجات بدون نسخ)
+        first_avg = sum(islice(scores, 10)) / 10
+        last_avg = sum(scores[i] for i in range(-10, 0)) / 10
         
         return max(0.0, last_avg - first_avg)  # التحسن في الأداء
\ No newline at end of file
@@ -72,6 +72,7 @@ class NanoApp:
         def save_state():
             try:
                 self.brain.save_brain_state()
+                self.brain.flush_saves()
                 return jsonify({'message': 'تم حفظ حالة العقل بنجاح'})
             except Exception as e:
                 return jsonify({'error': f'فشل الحفظ: {str(e)}'}), 500
@@ -105,6 +106,7 @@ class NanoApp:
                 
                 if user_input.lower() == 'حفظ':
                     self.brain.save_brain_state()
+                    self.brain.flush_saves()
                     print("💾 تم حفظ حالة العقل")
                     continue
                 
@@ -137,6 +139,7 @@ class NanoApp:
         
         # حفظ الحالة عند الخروج
         self.brain.save_brain_state()
+        self.brain.flush_and_close()
         print("💾 تم حفظ حالة العقل تلقائياً")
 
     def run_web_mode(self, host='127.0.0.1', port=5000):
@@ -151,19 +151,29 @@ class SmartAutoTrainer:
     
     def analyze_emotion_context(self, text: str) -> Dict[str, float]:
         """تحليل مشاعر النص بناء على السياق"""
-        text = text.lower()
-        emotions = {}
-        
-        for emotion, patterns in self.emotion_patterns.items():
-            score = 0.0
-            for pattern in patterns:
-                if pattern in text:
-                    # وزن أكبر للتعبيرات الطويلة
-                    weight = len(pattern.split()) * 0.3
-                    score += weight
-            emotions[emotion] = min(score, 1.0)
-        
-        return emotions
+        return self.analyze_emotion_context_batch([text])[0]
+    
+    def analyze_emotion_context_batch(self, texts: List[str]) -> List[Dict[str, float]]:
+        """تحليل مشاعر مجموعة نصوص دفعة واحدة"""
+        # حساب أوزان الأنماط مرة واحدة لكل الدفعة (وزن أكبر للتعبيرات الطويلة)
+        weighted_patterns = [
+            (emotion, [(pattern, len(pattern.split()) * 0.3) for pattern in patterns])
+            for emotion, patterns in self.emotion_patterns.items()
+        ]
+        
+        results = []
+        for text in texts:
+            text = text.lower()
+            emotions = {}
+            for emotion, patterns in weighted_patterns:
+                score = 0.0
+                for pattern, weight in patterns:
+                    if pattern in text:
+                        score += weight
+                emotions[emotion] = min(score, 1.0)
+            results.append(emotions)
+        
+        return results
     
     def quality_check(self, text: str) -> float:
         """تقييم جودة النص للتدريب"""
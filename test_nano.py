@@ -1,11 +1,21 @@
 # test_nano.py - اختبار نانو الجديد
+import copy
+import json
+import pickle
+import shutil
 import sys
+import tempfile
+from datetime import datetime
 from pathlib import Path
 
 # إضافة مسار core
 sys.path.append(str(Path(__file__).parent / "core"))
 
 from core.nano_brain import NanoBrain
+from core.contextual_emotion_engine import ContextualEmotionEngine
+from core.neural_response_engine import NeuralResponseEngine
+
+DATA_DIR = Path(__file__).parent / "data"
 
 def test_nano_personality():
     """اختبار شخصية نانو الطبيعية"""
@@ -119,6 +129,189 @@ def test_learning_system():
     
     print("✅ نظام التعلم يعمل بشكل صحيح")
 
+def test_deep_update():
+    """اختبار دمج الإعدادات بدون تعديل القواميس الأصلية"""
+    
+    print("\n⚙️ اختبار دمج الإعدادات")
+    print("=" * 40)
+    
+    try:
+        from advanced_auto_scheduler import AdvancedAutoScheduler
+    except ImportError as e:
+        print(f"⏭️ تم تخطي الاختبار (مكتبة غير مثبتة: {e.name})")
+        return
+    
+    # بدون تشغيل __init__ (يبدأ السجلات ويقرأ ملفات الإعدادات)
+    scheduler = AdvancedAutoScheduler.__new__(AdvancedAutoScheduler)
+    
+    base = {"training_schedule": {"interval_hours": 2, "peak_hours": [9, 14]}, "backup": {"enable_backup": True}}
+    update = {"training_schedule": {"interval_hours": 4}, "performance": {"batch_size": 50}}
+    base_before = copy.deepcopy(base)
+    update_before = copy.deepcopy(update)
+    
+    merged = scheduler.deep_update(base, update)
+    
+    assert merged == {
+        "training_schedule": {"interval_hours": 4, "peak_hours": [9, 14]},
+        "backup": {"enable_backup": True},
+        "performance": {"batch_size": 50}
+    }, f"نتيجة دمج غير متوقعة: {merged}"
+    assert base == base_before, "deep_update عدّل القاموس الأساسي"
+    assert update == update_before, "deep_update عدّل قاموس التحديث"
+    
+    print("✅ الدمج صحيح والقواميس الأصلية لم تتغير")
+
+def test_emotion_persistence():
+    """اختبار ترحيل بيانات المشاعر من pickle القديم وحفظها ثم تحميلها من JSON المضغوط"""
+    
+    print("\n💾 اختبار حفظ بيانات المشاعر")
+    print("=" * 40)
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        shutil.copy(DATA_DIR / "emotion_learning.pkl", tmp)
+        with open(DATA_DIR / "emotion_learning.pkl", "rb") as f:
+            legacy = pickle.load(f)
+        
+        # ترحيل الملف القديم
+        data_path = str(Path(tmp) / "emotion_learning.json.gz")
+        engine = ContextualEmotionEngine(data_path)
+        
+        assert engine.learning_stats["total_conversations"] == legacy["learning_stats"]["total_conversations"]
+        assert [item.user_input for item in engine.conversation_history] == \
+            [item["user_input"] for item in legacy["conversation_history"]], "تاريخ المحادثة لم يُرحّل"
+        for emotion, weights in legacy["situation_emotion_map"].items():
+            row = engine.get_weight_row(emotion)
+            for feature, weight in weights.items():
+                assert row[engine.feature_index[feature]] == weight, f"وزن {emotion}/{feature} لم يُرحّل"
+        
+        # تعلم جديد ثم حفظ وتحميل
+        for text, score in [("أنا فرحان اليوم", 0.9), ("ليش ما ترد علي؟", 0.4)]:
+            emotion, _, _ = engine.predict_emotion_contextual(text)
+            engine.learn_from_interaction(text, emotion, "test", score)
+        engine.save_learning_data()
+        assert Path(data_path).exists(), "لم يُكتب ملف JSON المضغوط"
+        
+        reloaded = ContextualEmotionEngine(data_path)
+        assert reloaded.feature_names == engine.feature_names
+        assert reloaded.weight_matrix == engine.weight_matrix
+        assert dict(reloaded.context_weights) == dict(engine.context_weights)
+        assert reloaded.learning_stats == engine.learning_stats
+        assert [item.to_dict() for item in reloaded.conversation_history] == \
+            [item.to_dict() for item in engine.conversation_history]
+        assert reloaded.get_learning_insights() == engine.get_learning_insights()
+    
+    print("✅ الترحيل والحفظ والتحميل متطابقة")
+
+def test_brain_persistence():
+    """اختبار ترحيل brain_state.json القديم وتطابق الحالة بعد الحفظ والتحميل"""
+    
+    print("\n💾 اختبار حفظ حالة العقل")
+    print("=" * 40)
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        data_path = Path(tmp) / "data"
+        shutil.copytree(DATA_DIR, data_path)
+        with open(data_path / "brain_state.json", "r", encoding="utf-8") as f:
+            legacy = json.load(f)
+        
+        # ترحيل الملف القديم
+        nano = NanoBrain(str(data_path))
+        try:
+            assert nano.performance_stats["total_interactions"] == legacy["performance_stats"]["total_interactions"]
+            assert nano.user_profile["relationship_level"] == legacy["user_profile"]["relationship_level"]
+            assert nano.user_profile["last_interaction"] == datetime.fromisoformat(legacy["user_profile"]["last_interaction"])
+            assert [msg.user_input for msg in nano.conversation_memory] == \
+                [msg["user_input"] for msg in legacy["conversation_memory"]], "الذاكرة لم تُرحّل"
+            
+            # محادثة قصيرة ثم حفظ
+            for user_input in ["مرحبا", "كيف حالك؟", "تمام"]:
+                nano.generate_response(user_input)
+            nano.save_brain_state()
+            nano.flush_saves()
+            assert (data_path / "brain_state.pkl").exists(), "لم يُكتب brain_state.pkl"
+            assert (data_path / "interactions.jsonl").exists(), "لم يُكتب سجل التفاعلات"
+            
+            # التحميل من الصيغة الجديدة
+            reloaded = NanoBrain(str(data_path))
+            reloaded.flush_and_close()
+            assert reloaded.user_profile == nano.user_profile
+            assert reloaded.behavior_settings == nano.behavior_settings
+            assert reloaded.performance_stats == nano.performance_stats
+            assert list(reloaded.conversation_memory) == list(nano.conversation_memory)
+            
+            # سطر أخير ناقص في سجل التفاعلات (انقطاع أثناء الكتابة) يُتجاهل
+            with open(data_path / "interactions.jsonl", "a", encoding="utf-8") as f:
+                f.write('{"timestamp": 1.0, "user_input": "مر')
+            torn = NanoBrain(str(data_path))
+            try:
+                assert list(torn.conversation_memory) == list(nano.conversation_memory), "السطر الناقص أفسد استعادة الذاكرة"
+                
+                # التفاعل التالي يُلحق على سطر جديد ولا يضيع
+                torn.generate_response("وش أخبارك؟")
+                torn.save_brain_state()
+                torn.flush_saves()
+            finally:
+                torn.flush_and_close()
+            reloaded = NanoBrain(str(data_path))
+            reloaded.flush_and_close()
+            assert list(reloaded.conversation_memory) == list(torn.conversation_memory), "ضاع التفاعل الملحق بعد السطر الناقص"
+        finally:
+            nano.flush_and_close()
+    
+    print("✅ الترحيل والحفظ والتحميل متطابقة")
+
+def neural_engine_state(engine):
+    """لقطة من حالة المحرك العصبي للمقارنة"""
+    return (
+        list(engine.response_patterns),
+        dict(engine.word_associations),
+        dict(engine.context_response_map),
+        engine.get_learning_statistics()
+    )
+
+def test_learning_journal():
+    """اختبار سجل التعلم: الإلحاق ثم الاستعادة، وتجاهل سطر أخير انقطعت كتابته"""
+    
+    print("\n📒 اختبار سجل التعلم")
+    print("=" * 40)
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        data_path = Path(tmp) / "data"
+        shutil.copytree(DATA_DIR, data_path)
+        journal_path = data_path / "learning_journal.jsonl"
+        
+        # تحميل الملفات القديمة ثم تعلم جديد يُلحق بالسجل
+        engine = NeuralResponseEngine(str(data_path))
+        engine.learn_from_feedback("وش أخبارك؟", "كله طيب والحمدلله", "friendly", 0.9)
+        engine.learn_from_feedback("مرحبا يا صديقي", "أهلين والله", "greeting", 0.8)
+        engine.learn_from_feedback("وش أخبارك؟", "ما أدري", "friendly", 0.3)
+        engine.generate_smart_response("وش أخبارك؟", "محايد")
+        engine.save_learned_data()
+        assert journal_path.stat().st_size > 0, "لم تُلحق التعديلات بالسجل"
+        expected = neural_engine_state(engine)
+        
+        reloaded = NeuralResponseEngine(str(data_path))
+        assert neural_engine_state(reloaded) == expected, "الحالة بعد استعادة السجل لا تطابق الأصل"
+        
+        # سطر أخير ناقص (انقطاع أثناء الكتابة) يُتجاهل
+        with open(journal_path, "a", encoding="utf-8") as f:
+            f.write('{"op": "add", "input": "وش')
+        reloaded = NeuralResponseEngine(str(data_path))
+        assert neural_engine_state(reloaded) == expected, "السطر الناقص أفسد الاستعادة"
+        
+        # التعلم بعده يُلحق على سطر جديد ولا يضيع
+        reloaded.learn_from_feedback("صباح الخير", "صباح النور", "greeting", 0.85)
+        reloaded.save_learned_data()
+        expected = neural_engine_state(reloaded)
+        assert neural_engine_state(NeuralResponseEngine(str(data_path))) == expected, "ضاع التعلم الملحق بعد السطر الناقص"
+        
+        # اللقطة الكاملة تفرغ السجل بدون تغيير الحالة
+        reloaded.save_learned_data(compact=True)
+        assert journal_path.stat().st_size == 0, "السجل لم يُفرّغ بعد اللقطة"
+        assert neural_engine_state(NeuralResponseEngine(str(data_path))) == expected
+    
+    print("✅ السجل يُستعاد كاملاً والسطر الناقص يُتجاهل")
+
 def main():
     """الدالة الرئيسية"""
     
@@ -135,12 +328,25 @@ def main():
         # اختبار نظام التعلم
         test_learning_system()
         
+        # اختبار دمج الإعدادات
+        test_deep_update()
+        
+        # اختبار حفظ بيانات المشاعر
+        test_emotion_persistence()
+        
+        # اختبار حفظ حالة العقل
+        test_brain_persistence()
+        
+        # اختبار سجل التعلم
+        test_learning_journal()
+        
         print("\n🎉 جميع الاختبارات مكتملة!")
         print("✅ نانو الجديد جاهز للاستخدام")
         
     except Exception as e:
         print(f"\n❌ خطأ في الاختبار: {e}")
         print("🔧 تأكد من تثبيت المتطلبات: pip install -r requirements.txt")
+        sys.exit(1)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
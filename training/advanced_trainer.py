@@ -779,6 +779,7 @@ def main():
             
         elif choice == "6":
             nano_brain.save_brain_state()
+            nano_brain.flush_and_close()
             print("👋 تم حفظ حالة العقل. وداعاً!")
             break
             